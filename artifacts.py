@@ -0,0 +1,165 @@
+import gzip
+import io
+import os
+import queue
+import threading
+import time
+from logger import log_message
+
+# Image formats PIL can re-encode screenshots to
+FORMATS = {'png': 'PNG', 'jpeg': 'JPEG', 'webp': 'WEBP'}
+EXTENSIONS = {'png': '.png', 'jpeg': '.jpg', 'webp': '.webp'}
+
+# Per directory: files kept (newest first) and maximum age in days; 0 disables the limit
+DEFAULT_RETENTION = {
+    'screenshots': {'max_files': 500, 'max_age_days': 30},
+    'error_screenshots': {'max_files': 100, 'max_age_days': 7},
+}
+
+PRUNE_EVERY = 20
+
+class ArtifactWriter:
+    """
+    Writes screenshots and HTML dumps for one directory on a background
+    thread. Callers only capture the raw bytes; re-encoding, compression,
+    disk writes and the retention policy happen off the search loop.
+    """
+    def __init__(self, directory, fmt='png', quality=80, compress_html=False, max_files=0, max_age_days=0):
+        self.directory = directory
+        self.fmt = fmt if fmt in FORMATS else 'png'
+        self.quality = quality
+        self.compress_html = compress_html
+        self.max_files = max_files
+        self.max_age_days = max_age_days
+        self.queue = queue.Queue()
+        self.writes = 0
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name=f"artifacts-{directory}", daemon=True)
+        self.thread.start()
+        self.queue.put(('prune', None, None))
+
+    def configure(self, fmt=None, quality=None, compress_html=None, max_files=None, max_age_days=None):
+        if fmt in FORMATS:
+            self.fmt = fmt
+        if quality is not None:
+            self.quality = quality
+        if compress_html is not None:
+            self.compress_html = compress_html
+        if max_files is not None:
+            self.max_files = max_files
+        if max_age_days is not None:
+            self.max_age_days = max_age_days
+
+    def save_screenshot(self, name, png_bytes):
+        """Queue a PNG capture; returns the path it will be written to."""
+        path = os.path.join(self.directory, name + EXTENSIONS[self.fmt])
+        self.queue.put(('image', path, png_bytes))
+        return path
+
+    def save_html(self, name, html):
+        path = os.path.join(self.directory, name + ('.html.gz' if self.compress_html else '.html'))
+        self.queue.put(('html', path, html))
+        return path
+
+    def flush(self, timeout=10):
+        """Wait until everything queued so far is on disk."""
+        done = threading.Event()
+        self.queue.put(('flush', None, done))
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            kind, path, payload = self.queue.get()
+            try:
+                if kind == 'image':
+                    self._write(path, self._encode(payload))
+                elif kind == 'html':
+                    data = payload.encode('utf-8')
+                    self._write(path, gzip.compress(data) if self.compress_html else data)
+                elif kind == 'prune':
+                    self.prune()
+                elif kind == 'flush':
+                    payload.set()
+            except Exception as e:
+                log_message(f"[Artifacts] Could not write {path}: {e}")
+
+    def _encode(self, png_bytes):
+        if self.fmt == 'png':
+            return png_bytes
+        # PIL is only loaded by writers that re-encode
+        try:
+            from PIL import Image
+        except ImportError:
+            return png_bytes
+        image = Image.open(io.BytesIO(png_bytes))
+        if self.fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, FORMATS[self.fmt], quality=self.quality)
+        return output.getvalue()
+
+    def _write(self, path, data):
+        # Path extension follows the format chosen when the capture was queued
+        with open(path, 'wb') as f:
+            f.write(data)
+        log_message(f"[Artifacts] Saved {path}")
+        self.writes += 1
+        if self.writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Apply the retention policy: drop files past max_age_days, then keep the newest max_files."""
+        if not self.max_files and not self.max_age_days:
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                entries.append((os.path.getmtime(path), path))
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else None
+        removed = 0
+        for index, (mtime, path) in enumerate(entries):
+            if (self.max_files and index >= self.max_files) or (cutoff and mtime < cutoff):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            log_message(f"[Artifacts] Removed {removed} old file(s) from {self.directory}")
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def writer_options(directory, personal_info):
+    retention = dict(DEFAULT_RETENTION.get(directory, {'max_files': 0, 'max_age_days': 0}))
+    retention.update(personal_info.get('artifact_retention', {}).get(directory, {}))
+    return {
+        'fmt': personal_info.get('artifact_format', 'png'),
+        'quality': int(personal_info.get('artifact_quality', 80)),
+        'compress_html': personal_info.get('artifact_compress_html', False),
+        'max_files': retention['max_files'],
+        'max_age_days': retention['max_age_days'],
+    }
+
+def get_writer(directory, personal_info=None):
+    """
+    Shared writer for `directory`. Options come from personal_info:
+    artifact_format (png, jpeg, webp), artifact_quality, artifact_compress_html
+    and artifact_retention ({directory: {max_files, max_age_days}}).
+    """
+    options = writer_options(directory, personal_info or {})
+    with _writers_lock:
+        if directory not in _writers:
+            _writers[directory] = ArtifactWriter(directory, **options)
+        elif personal_info is not None:
+            _writers[directory].configure(**options)
+        return _writers[directory]
+
+def flush_all(timeout=10):
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush(timeout)
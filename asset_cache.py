@@ -0,0 +1,182 @@
+import re
+import time
+from collections import OrderedDict
+from logger import log_message
+import metrics
+
+# Resource types worth keeping: bundles and styles are the same on every relaunch
+CACHEABLE_TYPES = {'script', 'stylesheet', 'font', 'image'}
+
+DEFAULT_MAX_BYTES = 64 * 2 ** 20
+# A single response larger than this is never stored
+MAX_ENTRY_FRACTION = 0.25
+
+# Headers the browser must not see on a fulfilled body: it is already decoded
+# and its length is recomputed by Playwright
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie', 'date', 'age'}
+
+# Marks responses served from memory so they are not stored again
+SERVED_HEADER = 'x-meulade-cache'
+
+def header(headers, name):
+    return headers.get(name) or headers.get(name.lower())
+
+def max_age(cache_control):
+    """Freshness lifetime in seconds from a Cache-Control header, 0 when it must be revalidated."""
+    if 'immutable' in cache_control:
+        return 365 * 86400
+    match = re.search(r'(?:s-maxage|max-age)=(\d+)', cache_control)
+    return int(match.group(1)) if match and 'no-cache' not in cache_control else 0
+
+def storable(status, headers):
+    cache_control = (header(headers, 'cache-control') or '').lower()
+    if status != 200 or 'no-store' in cache_control or 'private' in cache_control:
+        return False
+    vary = (header(headers, 'vary') or '').lower()
+    if vary and any(value.strip() not in ('accept-encoding', '') for value in vary.split(',')):
+        return False
+    # Without a lifetime or a validator there is nothing safe to reuse
+    return bool(max_age(cache_control) or header(headers, 'etag') or header(headers, 'last-modified'))
+
+class CachedAsset:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS}
+        self.body = body
+        self.etag = header(headers, 'etag')
+        self.last_modified = header(headers, 'last-modified')
+        self.max_age = max_age((header(headers, 'cache-control') or '').lower())
+        self.stored_at = time.time()
+
+    def fresh(self):
+        return time.time() - self.stored_at < self.max_age
+
+    def validators(self):
+        validators = {}
+        if self.etag:
+            validators['if-none-match'] = self.etag
+        if self.last_modified:
+            validators['if-modified-since'] = self.last_modified
+        return validators
+
+
+class AssetCache:
+    """
+    Route handler serving static assets (scripts, styles, fonts, images)
+    from memory, shared by every context of the process. Misses go through
+    the browser as usual and are stored from the response, so the sites
+    keep seeing Chromium's own requests. Fresh entries are served without
+    a request; stale ones are revalidated with their ETag / Last-Modified
+    and reused on 304. Least recently used entries are evicted once the
+    total body size goes over `max_bytes`.
+
+    Register it before the ResourceFilter: Playwright runs the last route
+    first, so only requests the filter lets through (route.fallback) reach it.
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, url):
+        entry = self.entries.get(url)
+        if entry:
+            self.entries.move_to_end(url)
+        return entry
+
+    def put(self, url, entry):
+        if len(entry.body) > self.max_bytes * MAX_ENTRY_FRACTION:
+            return
+        self.discard(url)
+        self.entries[url] = entry
+        self.size += len(entry.body)
+        while self.size > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted.body)
+            self.evictions += 1
+
+    def discard(self, url):
+        entry = self.entries.pop(url, None)
+        if entry:
+            self.size -= len(entry.body)
+
+    def count(self, result, site):
+        setattr(self, result, getattr(self, result) + 1)
+        metrics.inc('asset_cache_total', site=site, result=result)
+
+    async def handle(self, route, request, site):
+        if request.method != 'GET' or request.resource_type not in CACHEABLE_TYPES:
+            await route.fallback()
+            return
+        url = request.url
+        entry = self.get(url)
+        if entry and entry.fresh():
+            self.count('hits', site)
+            await self.serve(route, entry)
+            return
+        if entry and entry.validators():
+            try:
+                response = await route.fetch(headers=dict(request.headers, **entry.validators()))
+            except Exception:
+                response = None
+            if response and response.status == 304:
+                entry.stored_at = time.time()
+                self.count('revalidated', site)
+                await self.serve(route, entry)
+                return
+            if response and response.ok and response.url == url:
+                # Changed upstream: this is the new version
+                self.count('misses', site)
+                body = await response.body()
+                self.store(url, response.status, response.headers, body)
+                await route.fulfill(response=response, body=body)
+                return
+            self.discard(url)
+        self.count('misses', site)
+        await route.fallback()
+
+    async def serve(self, route, entry):
+        await route.fulfill(status=entry.status, headers=dict(entry.headers, **{SERVED_HEADER: 'hit'}), body=entry.body)
+
+    def store(self, url, status, headers, body):
+        if storable(status, headers):
+            self.put(url, CachedAsset(status, headers, body))
+        else:
+            self.discard(url)
+
+    async def on_response(self, response):
+        """Keep the static assets the browser fetched itself."""
+        request = response.request
+        if (request.method != 'GET' or request.resource_type not in CACHEABLE_TYPES
+                or SERVED_HEADER in response.headers or request.redirected_from):
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            return  # redirect, aborted or evicted from the browser's buffer
+        self.store(response.url, response.status, response.headers, body)
+
+    def summary(self):
+        return (f"{self.hits} hits, {self.revalidated} revalidated, {self.misses} misses, "
+                f"{len(self.entries)} entries ({self.size // 1024} KB, {self.evictions} evicted)")
+
+
+default_cache = AssetCache()
+
+def configure(personal_info):
+    """Apply asset_cache_mb from the config to the shared cache."""
+    max_mb = personal_info.get('asset_cache_mb')
+    if max_mb:
+        default_cache.max_bytes = int(max_mb) * 2 ** 20
+
+async def install(context, site, cache=None):
+    """Serve static assets of `context` from the shared cache."""
+    cache = cache or default_cache
+    await context.route('**/*', lambda route, request: cache.handle(route, request, site))
+    context.on('response', cache.on_response)
+    log_message(f"[Cache] Static asset cache enabled for {site}")
+    return cache
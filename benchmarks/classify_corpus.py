@@ -0,0 +1,112 @@
+"""
+Regression check and micro-benchmark for the RVSQ result classifier.
+
+Every fixture in benchmarks/fixtures/rvsq is named `<expected status>__<name>.html`.
+Each one is classified by the HTTP response parser (no browser) and, when
+Chromium is installed, by the in-page classifier on a blank page.
+
+    python -m benchmarks.classify_corpus
+    python -m benchmarks.classify_corpus --import screenshots   # add saved slot_found_*.html pages
+"""
+import argparse
+import asyncio
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import classifier
+import rvsq_http
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'rvsq')
+
+def load_corpus():
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))):
+        expected = os.path.basename(path).split('__')[0]
+        with open(path, encoding='utf-8') as f:
+            corpus.append((os.path.basename(path), expected, f.read()))
+    return corpus
+
+def import_pages(directory):
+    """
+    Copy saved RVSQ slot_found_*.html pages into the corpus as `slots` fixtures.
+    Input values are scrubbed; check the copies before committing them.
+    """
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(directory, 'slot_found_*.html'))):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        if 'ClinicList' not in html:
+            continue  # Bonjour Santé page
+        html = re.sub(r'(<input[^>]*?\svalue=)"[^"]*"', r'\1""', html)
+        target = os.path.join(FIXTURES_DIR, 'slots__' + os.path.basename(path))
+        if not os.path.exists(target):
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(html)
+            imported += 1
+    print(f"Imported {imported} page(s) into {FIXTURES_DIR}")
+
+def run_http(corpus, repeat):
+    failures = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, expected, html in corpus:
+            result, _ = rvsq_http.classify_response(html)
+            if result.status != expected and name not in failures:
+                failures.append(name)
+                print(f"  [http] {name}: expected {expected}, got {result!r}")
+    elapsed = time.perf_counter() - start
+    return failures, elapsed * 1000 / (repeat * len(corpus))
+
+async def run_browser(corpus, repeat):
+    from playwright.async_api import async_playwright
+    failures = []
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.route('**/*', lambda route: route.abort())
+        elapsed = 0.0
+        for name, expected, html in corpus:
+            await page.set_content(html, wait_until='domcontentloaded')
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = await classifier.classify_rvsq(page)
+            elapsed += time.perf_counter() - start
+            if result.status != expected:
+                failures.append(name)
+                print(f"  [page] {name}: expected {expected}, got {result!r}")
+        await browser.close()
+    return failures, elapsed * 1000 / (repeat * len(corpus))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--import', dest='import_dir', help='directory holding saved slot_found_*.html pages')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--no-browser', action='store_true', help='only run the HTTP parser')
+    args = parser.parse_args()
+
+    if args.import_dir:
+        import_pages(args.import_dir)
+
+    corpus = load_corpus()
+    print(f"{len(corpus)} fixture(s)")
+    failures, per_page = run_http(corpus, args.repeat)
+    print(f"http parser: {len(corpus) - len(failures)}/{len(corpus)} correct, {per_page:.3f} ms/page")
+
+    if not args.no_browser:
+        try:
+            page_failures, per_page = asyncio.run(run_browser(corpus, args.repeat))
+        except Exception as e:
+            print(f"in-page classifier skipped: {str(e).splitlines()[0]}")
+        else:
+            print(f"in-page classifier: {len(corpus) - len(page_failures)}/{len(corpus)} correct, {per_page:.3f} ms/call")
+            failures += page_failures
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
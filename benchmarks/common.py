@@ -0,0 +1,41 @@
+"""Result storage shared by the benchmarks: one JSON file per run, tagged with the commit."""
+import json
+import os
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+def commit_id():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '') if commit else 'unknown'
+    except OSError:
+        return 'unknown'
+
+def save_result(scenario_key, scenario, results):
+    directory = os.path.join(RESULTS_DIR, scenario_key)
+    os.makedirs(directory, exist_ok=True)
+    record = {
+        'commit': commit_id(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'scenario': scenario,
+        'results': results,
+    }
+    path = os.path.join(directory, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{record['commit']}.json")
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=2)
+    return path
+
+def load_results(scenario_key):
+    """Saved runs of a scenario, oldest first."""
+    directory = os.path.join(RESULTS_DIR, scenario_key)
+    if not os.path.isdir(directory):
+        return []
+    records = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name)) as f:
+            records.append(json.load(f))
+    return records
@@ -0,0 +1,347 @@
+"""
+Local stand-ins for the RVSQ and Bonjour Santé pages, reproducing only the
+selectors the flows depend on (Principale.aspx form IDs, #ClinicList, the
+hub iframe, app-locked-walkin-availability).
+
+Search responses can be delayed (`latency_ms`) and slots appear on a
+schedule of (start, duration) windows, in seconds since the server started.
+Both sites are served from one port; the hub iframe is loaded from
+hub.bonjour-sante.ca.localhost, which Chromium resolves to 127.0.0.1.
+
+    python -m benchmarks.mock_sites --port 8765 --slots-at 30 --latency-ms 200
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rvsq_flow
+
+RVSQ_PATH = '/prendrerendezvous/Principale.aspx'
+BONJOUR_PATH = '/uno/clinique'
+HUB_PATH = '/hub'
+AVAILABILITY_PATH = '/hub/api/availability'
+
+MONTH_OPTIONS = ''.join(f'<option value="{m:02d}">{m:02d}</option>' for m in range(1, 13))
+
+RVSQ_PAGE = """<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>Rendez-vous santé Québec</title></head>
+<body>
+<div id="consent"><button id="btnToutAccepter" type="button">Tout accepter</button></div>
+<div id="app"></div>
+<script>
+const app = document.getElementById('app');
+let viewState = 'vs0';
+document.getElementById('btnToutAccepter').onclick = () => document.getElementById('consent').remove();
+
+function post(fields) {
+    return fetch(location.pathname, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/x-www-form-urlencoded'},
+        body: new URLSearchParams(Object.assign({__VIEWSTATE: viewState}, fields)),
+    }).then(response => response.text());
+}
+
+function identity() {
+    app.innerHTML = `
+        <input id="ctl00_ContentPlaceHolderMP_AssureForm_FirstName">
+        <input id="ctl00_ContentPlaceHolderMP_AssureForm_LastName">
+        <input id="ctl00_ContentPlaceHolderMP_AssureForm_NAM">
+        <input id="ctl00_ContentPlaceHolderMP_AssureForm_CardSeqNumber">
+        <input id="ctl00_ContentPlaceHolderMP_AssureForm_Day">
+        <select id="ctl00_ContentPlaceHolderMP_AssureForm_Month">%(months)s</select>
+        <input id="ctl00_ContentPlaceHolderMP_AssureForm_Year">
+        <label><input type="checkbox" id="AssureForm_CSTMT"> J'accepte</label>
+        <button id="ctl00_ContentPlaceHolderMP_myButton" type="button" disabled>Continuer</button>`;
+    const consent = document.getElementById('AssureForm_CSTMT');
+    const button = document.getElementById('ctl00_ContentPlaceHolderMP_myButton');
+    consent.onchange = () => { button.disabled = !consent.checked; };
+    button.onclick = () => post({step: 'identity'}).then(familyDoctor);
+}
+
+function familyDoctor() {
+    app.innerHTML = `
+        <p>Je n'ai pas de médecin de famille</p>
+        <a class="h-SelectAssureBtn ctx-changer" data-type="3" href="#">Clinique à proximité</a>`;
+    app.querySelector('a').onclick = event => { event.preventDefault(); post({step: 'family_doctor'}).then(reason); };
+}
+
+function reason() {
+    app.innerHTML = `
+        <select id="consultingReason"><option value="">Choisir</option></select>
+        <select id="perimeterCombo"><option value="1">25 km</option><option value="0">50 km</option></select>
+        <button type="button">Rechercher</button>`;
+    // Options are filled in asynchronously, as on the live site
+    setTimeout(() => {
+        const option = document.createElement('option');
+        option.value = '%(reason_id)s';
+        option.textContent = 'Consultation urgente';
+        document.getElementById('consultingReason').appendChild(option);
+    }, 300);
+    app.querySelector('button').onclick = () => post({step: 'reason'}).then(search);
+}
+
+function search() {
+    app.innerHTML = `
+        <input id="PostalCode">
+        <select id="perimeterCombo"><option value="1">25 km</option><option value="0">50 km</option></select>
+        <button type="button" class="h-SearchButton btn btn-primary">Rechercher</button>
+        <div id="results"></div>`;
+    const results = document.getElementById('results');
+    app.querySelector('button').onclick = () => post({
+        PostalCode: document.getElementById('PostalCode').value,
+        perimeterCombo: document.getElementById('perimeterCombo').value,
+    }).then(html => {
+        results.innerHTML = html;
+        const state = results.querySelector('input[name="__VIEWSTATE"]');
+        if (state) viewState = state.value;
+    });
+}
+
+identity();
+</script>
+</body></html>
+"""
+
+RVSQ_NO_SLOTS = """<input type="hidden" name="__VIEWSTATE" value="%(state)s">
+<div id="clinicsWithNoDisponibilities">Aucun rendez-vous répondant à vos critères de recherche n'est disponible.</div>
+"""
+
+RVSQ_SLOTS = """<input type="hidden" name="__VIEWSTATE" value="%(state)s">
+<h3>Les cliniques suivantes offrent des disponibilités</h3>
+<ul id="ClinicList"><li><a class="h-selectClinic" href="#">Clinique médicale du benchmark</a></li></ul>
+"""
+
+BONJOUR_PAGE = """<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>Bonjour Santé</title></head>
+<body>
+<div id="didomi-host"><button id="didomi-notice-agree-button" type="button">J'accepte</button></div>
+<div data-test="postalCodeCategoryButton">Clinique de ma région</div>
+<div id="search" style="display: none">
+    <input id="patient-nam-input">
+    <input id="postal-code-search-input">
+    <button type="button" data-test="searchPostalCodeButton">Rechercher</button>
+</div>
+<div id="hub"></div>
+<script>
+document.getElementById('didomi-notice-agree-button').onclick = () => document.getElementById('didomi-host').remove();
+document.querySelector('[data-test="postalCodeCategoryButton"]').onclick = () => { document.getElementById('search').style.display = 'block'; };
+document.querySelector('[data-test="searchPostalCodeButton"]').onclick = () => {
+    document.getElementById('hub').innerHTML =
+        `<iframe src="http://hub.bonjour-sante.ca.localhost:${location.port}%(hub_path)s" width="900" height="700"></iframe>`;
+};
+</script>
+</body></html>
+"""
+
+HUB_PAGE = """<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>Hub</title>
+<style>mat-radio-button, app-locked-walkin-availability { display: block; }</style></head>
+<body>
+<div id="app"></div>
+<script>
+const app = document.getElementById('app');
+
+function identity() {
+    app.innerHTML = `
+        <input id="healthInsuranceNumber">
+        <input id="healthInsuranceNumberSequence">
+        <input id="firstName">
+        <input id="lastName">
+        <button id="confirm" type="button">Confirmer</button>`;
+    document.getElementById('confirm').onclick = criteria;
+}
+
+function criteria() {
+    app.innerHTML = `
+        <mat-radio-button id="mat-radio-1">Aujourd'hui</mat-radio-button>
+        <mat-radio-button id="mat-radio-2">À partir de</mat-radio-button>
+        <input id="mat-input-0">
+        <input type="range" min="0" max="4" value="1">
+        <button id="confirm" type="button">Confirmer</button>`;
+    document.getElementById('confirm').onclick = proceed;
+}
+
+function proceed() {
+    app.innerHTML = `<button id="continue" type="button">Continuer</button>`;
+    document.getElementById('continue').onclick = results;
+}
+
+function results() {
+    app.innerHTML = `<p>Recherche en cours...</p>`;
+    fetch('%(availability_path)s').then(response => response.json()).then(data => {
+        const found = data.slots
+            ? `<app-locked-walkin-availability data-test="locked-walkin-availability">Clinique du benchmark</app-locked-walkin-availability>
+               <button type="button" data-test="confirm-selection-button">Confirmer</button>`
+            : `<span class="label-message">Aucun rendez-vous ne correspond à vos critères de recherche</span>`;
+        app.innerHTML = `
+            <div class="title-criteria-container">Résultats de recherche</div>
+            ${found}
+            <button type="button" data-test="make-new-search">Modifier les critères de recherche</button>`;
+        app.querySelector('[data-test="make-new-search"]').onclick = criteria;
+    });
+}
+
+identity();
+</script>
+</body></html>
+"""
+
+
+class SlotSchedule:
+    """
+    Slot windows as (start, duration) seconds since the server started.
+    Records when a search first served slots in each window.
+    """
+    def __init__(self, windows=()):
+        self.windows = list(windows)
+        self.started_at = time.time()
+        self.first_served = {}
+        self.lock = threading.Lock()
+
+    def open_window(self, now=None):
+        elapsed = (now or time.time()) - self.started_at
+        for index, (start, duration) in enumerate(self.windows):
+            if start <= elapsed < start + duration:
+                return index
+        return None
+
+    def appeared_at(self, index):
+        return self.started_at + self.windows[index][0]
+
+    def serve(self):
+        """True if this search should see slots; remembers the first hit per window."""
+        now = time.time()
+        index = self.open_window(now)
+        if index is None:
+            return False
+        with self.lock:
+            self.first_served.setdefault(index, now)
+        return True
+
+    def report(self):
+        return [{
+            'start': start,
+            'duration': duration,
+            'served_after': round(self.first_served[index] - self.appeared_at(index), 3) if index in self.first_served else None,
+        } for index, (start, duration) in enumerate(self.windows)]
+
+
+class MockState:
+    def __init__(self, latency_ms=0, windows=()):
+        self.latency_ms = latency_ms
+        self.schedule = SlotSchedule(windows)
+        self.searches = {'rvsq': [], 'bonjoursante': []}
+        self.lock = threading.Lock()
+        self.state_counter = 0
+
+    def record_search(self, site):
+        with self.lock:
+            self.searches[site].append(time.time())
+            self.state_counter += 1
+            return f"vs{self.state_counter}"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def _send(self, body, content_type='text/html; charset=utf-8', status=200):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self):
+        if self.state.latency_ms:
+            time.sleep(self.state.latency_ms / 1000)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == RVSQ_PATH:
+            self._send(RVSQ_PAGE % {'months': MONTH_OPTIONS, 'reason_id': rvsq_flow.DEFAULT_REASON_ID})
+        elif path == BONJOUR_PATH:
+            self._send(BONJOUR_PAGE % {'hub_path': HUB_PATH})
+        elif path == HUB_PATH:
+            self._send(HUB_PAGE % {'availability_path': AVAILABILITY_PATH})
+        elif path == AVAILABILITY_PATH:
+            self._delay()
+            self.state.record_search('bonjoursante')
+            slots = self.state.schedule.serve()
+            self._send('{"slots": %s}' % ('true' if slots else 'false'), 'application/json')
+        else:
+            self._send('Not found', 'text/plain', 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if path != RVSQ_PATH:
+            self._send('Not found', 'text/plain', 404)
+        elif 'step' in form:
+            self._send('ok', 'text/plain')
+        else:
+            self._delay()
+            view_state = self.state.record_search('rvsq')
+            template = RVSQ_SLOTS if self.state.schedule.serve() else RVSQ_NO_SLOTS
+            self._send(template % {'state': view_state})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockSites:
+    """Both stand-in sites on one local port, served from a daemon thread."""
+    def __init__(self, port=0, latency_ms=0, windows=()):
+        self.state = MockState(latency_ms, windows)
+        handler = type('Handler', (MockHandler,), {'state': self.state})
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    @property
+    def rvsq_url(self):
+        return f"http://localhost:{self.port}{RVSQ_PATH}"
+
+    @property
+    def bonjoursante_url(self):
+        return f"http://localhost:{self.port}{BONJOUR_PATH}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def parse_windows(slots_at, duration):
+    return [(float(start), duration) for start in slots_at.split(',') if start.strip()] if slots_at else []
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=int, default=0, help='delay added to every search response')
+    parser.add_argument('--slots-at', default='', help='comma-separated seconds at which slots appear')
+    parser.add_argument('--slot-duration', type=float, default=60, help='seconds each slot window stays open')
+    args = parser.parse_args()
+
+    sites = MockSites(args.port, args.latency_ms, parse_windows(args.slots_at, args.slot_duration)).start()
+    print(f"RVSQ:          {sites.rvsq_url}")
+    print(f"Bonjour Santé: {sites.bonjoursante_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sites.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+End-to-end benchmark of the search loops against the local stand-in sites
+(benchmarks/mock_sites.py), without touching the live services.
+
+Runs the real RVSQ or Bonjour Santé flow in the engine until a slot is
+detected or `--duration` elapses, then reports:
+  - cycle throughput (searches per minute served by the mock)
+  - time from slot appearance to detection
+  - peak memory of this process and its Chromium children (needs psutil)
+
+Results are saved as JSON under benchmarks/results/<scenario>/, tagged with
+the current commit, so runs of the same scenario compare across commits.
+
+    python -m benchmarks.site_bench --site rvsq --slots-at 20
+    python -m benchmarks.site_bench --site rvsq --mode http --latency-ms 300
+    python -m benchmarks.site_bench --site bonjoursante --slots-at 40 --compare
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import browser
+import metrics
+from engine import get_engine
+from jobs import SharedBoolean
+from resource_filter import SITE_RULES
+from benchmarks.mock_sites import MockSites, parse_windows
+from benchmarks.common import save_result, load_results
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+FAKE_PERSONAL_INFO = {
+    'first_name': 'Test',
+    'last_name': 'Benchmark',
+    'nam': 'TEST 0000 0000',
+    'card_seq_number': '01',
+    'birth_day': '01',
+    'birth_month': '01',
+    'birth_year': '1980',
+    'postal_code': 'H2X 1Y4',
+    'cellphone': '5145550000',
+    'email': 'benchmark@example.com',
+}
+
+class MemorySampler:
+    """Samples the RSS of this process plus its children (Playwright driver, Chromium)."""
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def sample(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.samples.append(self.sample())
+
+    def start(self):
+        if psutil:
+            threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if not self.samples:
+            return {'peak_mb': None, 'mean_mb': None}
+        return {
+            'peak_mb': round(max(self.samples) / 2 ** 20, 1),
+            'mean_mb': round(sum(self.samples) / len(self.samples) / 2 ** 20, 1),
+        }
+
+
+def scenario_key(args):
+    return f"{args.site}_{args.mode}_{args.profile}_lat{args.latency_ms}_slots{args.slots_at or 'none'}".replace(',', '-')
+
+def build_config(args, sites):
+    personal_info = dict(FAKE_PERSONAL_INFO,
+                         rvsq_url=sites.rvsq_url,
+                         bonjoursante_url=sites.bonjoursante_url,
+                         launch_profile=args.profile,
+                         poll_mode=args.mode,
+                         pacing='fixed')
+    # Keep the request filter in the loop, with the mock host allowed
+    rules = {site: dict(site_rules, allow_domains=site_rules['allow_domains'] + ['localhost'])
+             for site, site_rules in SITE_RULES.items()}
+    return {'personal_info': personal_info, 'resource_rules': rules}
+
+def summarize(args, sites, started_at, detections, memory):
+    searches = sites.state.searches[args.site]
+    schedule = sites.state.schedule
+    results = {
+        'searches': len(searches),
+        'first_search_after': round(searches[0] - started_at, 3) if searches else None,
+        'searches_per_minute': None,
+        'mean_cycle_seconds': None,
+        'detection_latency': None,
+        'slot_windows': schedule.report(),
+        'memory': memory,
+    }
+    if len(searches) > 1:
+        span = searches[-1] - searches[0]
+        results['searches_per_minute'] = round((len(searches) - 1) * 60 / span, 2) if span else None
+        results['mean_cycle_seconds'] = round(span / (len(searches) - 1), 3)
+    if detections:
+        # Latency against the latest window that had appeared by then
+        started = [schedule.appeared_at(index) for index in range(len(schedule.windows)) if schedule.appeared_at(index) <= detections[0]]
+        if started:
+            results['detection_latency'] = round(detections[0] - max(started), 3)
+    cycle = metrics.default_registry.snapshot()['histograms'].get('cycle_seconds', {})
+    results['client_cycle'] = next((value for key, value in cycle.items() if args.site in key), None)
+    return results
+
+def run(args):
+    sites = MockSites(0, args.latency_ms, parse_windows(args.slots_at, args.slot_duration)).start()
+    config = build_config(args, sites)
+    running = SharedBoolean(True)
+    detections = []
+
+    # Record the detection time instead of saving evidence, then stop
+    async def record_detection(page, personal_info=None):
+        detections.append(time.time())
+        running.set(False)
+    browser.slot_found = record_detection
+
+    if args.site == 'rvsq':
+        coro = browser.run_automation_rvsq_async(config, running)
+    else:
+        coro = browser.run_automation_bonjoursante_async(config, running, False)
+
+    memory = MemorySampler().start()
+    started_at = time.time()
+    future = get_engine().submit(coro)
+    while not future.done() and not detections and time.time() - started_at < args.duration:
+        time.sleep(0.1)
+    running.set(False)
+    if not future.done():
+        # A detected slot leaves the flow waiting on the booking page
+        future.cancel()
+    try:
+        future.result(timeout=30)
+    except Exception:
+        pass
+    memory_report = memory.stop()
+    get_engine().shutdown()
+    sites.stop()
+    return summarize(args, sites, started_at, detections, memory_report)
+
+def save(args, results):
+    scenario = {key: getattr(args, key) for key in ('site', 'mode', 'profile', 'latency_ms', 'slots_at', 'slot_duration', 'duration')}
+    return save_result(scenario_key(args), scenario, results)
+
+def compare(args):
+    records = load_results(scenario_key(args))
+    if not records:
+        print(f"No saved results for {scenario_key(args)}")
+        return
+    print(f"{'commit':<16}{'when':<21}{'searches/min':>13}{'detect (s)':>12}{'peak MB':>10}")
+    for record in records:
+        results = record['results']
+        print(f"{record['commit']:<16}{record['timestamp']:<21}"
+              f"{str(results['searches_per_minute']):>13}{str(results['detection_latency']):>12}"
+              f"{str(results['memory']['peak_mb']):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--site', choices=['rvsq', 'bonjoursante'], default='rvsq')
+    parser.add_argument('--mode', choices=['browser', 'http'], default='browser', help='RVSQ poll mode')
+    parser.add_argument('--profile', choices=['visible', 'headless', 'lean'], default='headless')
+    parser.add_argument('--latency-ms', type=int, default=0, help='delay added to every search response')
+    parser.add_argument('--slots-at', default='20', help='comma-separated seconds at which slots appear ("" for none)')
+    parser.add_argument('--slot-duration', type=float, default=60)
+    parser.add_argument('--duration', type=float, default=120, help='give up after this many seconds')
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--compare', action='store_true', help='list saved results for this scenario afterwards')
+    args = parser.parse_args()
+
+    # Screenshots, error pages and pacing history stay out of the working tree
+    os.chdir(tempfile.mkdtemp(prefix='meulade-bench-'))
+    results = run(args)
+    print(json.dumps(results, indent=2))
+    if not args.no_save:
+        print(f"Saved {save(args, results)}")
+    if args.compare:
+        compare(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Cold-start benchmark: how long until the window is up.
+
+Each repeat starts a fresh interpreter that replays meulade.main() step by
+step and reports, in ms since the interpreter started importing:
+  - browser_check: the on-disk Chromium check
+  - import_gui:    importing the GUI module
+  - window:        AppGUI built and drawn (skipped without a display)
+  - heavy modules still unloaded at that point (playwright, cryptography)
+The parent also records the whole process wall time. Medians are saved
+under benchmarks/results/startup/ like the site benchmark.
+
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --legacy     # also time launching Chromium, the old check
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.common import save_result, load_results
+
+HEAVY_MODULES = ['playwright', 'cryptography', 'browser', 'engine']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+report = {}
+from browser_pool import chromium_installed
+chromium_installed()
+report['browser_check'] = (time.perf_counter() - start) * 1000
+import gui
+report['import_gui'] = (time.perf_counter() - start) * 1000
+try:
+    app = gui.AppGUI()
+    app.update()
+    report['window'] = (time.perf_counter() - start) * 1000
+    app.destroy()
+except Exception as e:
+    report['window'] = None
+    report['window_error'] = str(e).splitlines()[0]
+report['loaded_heavy_modules'] = [name for name in %r if name in sys.modules]
+print(json.dumps(report))
+"""
+
+LEGACY_PROBE = """
+import json, time
+start = time.perf_counter()
+from playwright.sync_api import sync_playwright
+with sync_playwright() as p:
+    try:
+        p.chromium.launch().close()
+        ok = True
+    except Exception:
+        ok = False
+print(json.dumps({'legacy_browser_check': (time.perf_counter() - start) * 1000, 'launched': ok}))
+"""
+
+def probe(script):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+    wall = (time.perf_counter() - start) * 1000
+    lines = [line for line in output.stdout.splitlines() if line.startswith('{')]
+    if not lines:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'probe produced no output')
+    report = json.loads(lines[-1])
+    report['process'] = wall
+    return report
+
+def median(reports, key):
+    values = [report[key] for report in reports if report.get(key) is not None]
+    return round(statistics.median(values), 1) if values else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--legacy', action='store_true', help='also time the old launch-Chromium check')
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--compare', action='store_true', help='list saved startup results afterwards')
+    args = parser.parse_args()
+
+    reports = [probe(PROBE % (HEAVY_MODULES,)) for _ in range(args.repeat)]
+    results = {key: median(reports, key) for key in ('browser_check', 'import_gui', 'window', 'process')}
+    results['loaded_heavy_modules'] = reports[-1]['loaded_heavy_modules']
+    if reports[-1].get('window_error'):
+        results['window_error'] = reports[-1]['window_error']
+    if args.legacy:
+        legacy = [probe(LEGACY_PROBE) for _ in range(args.repeat)]
+        results['legacy_browser_check'] = median(legacy, 'legacy_browser_check')
+
+    print(json.dumps(results, indent=2))
+    if not args.no_save:
+        print(f"Saved {save_result('startup', {'repeat': args.repeat}, results)}")
+    if args.compare:
+        print(f"{'commit':<16}{'when':<21}{'check':>8}{'gui':>8}{'window':>8}{'process':>9}")
+        for record in load_results('startup'):
+            r = record['results']
+            print(f"{record['commit']:<16}{record['timestamp']:<21}"
+                  f"{str(r['browser_check']):>8}{str(r['import_gui']):>8}{str(r['window']):>8}{str(r['process']):>9}")
+
+if __name__ == '__main__':
+    main()
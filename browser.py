@@ -1,59 +1,95 @@
-from playwright.sync_api import sync_playwright
+import asyncio
 import random
 import os
 from datetime import datetime
-import re
+import time
 try:
     import winsound
 except ImportError:
     winsound = None
-import sys
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from logger import log_message
-
-def get_playwright_path():
-    """Get the correct path for Playwright resources when bundled"""
-    if getattr(sys, 'frozen', False):
-        return {
-            'browser_path': sys._MEIPASS  # Just use the base directory
-        }
-    return None
-
-def try_click_slot(page):
+from engine import get_engine
+import rvsq_flow
+import rvsq_http
+import resource_filter
+import classifier
+import circuit
+import jobs
+import pacing
+import metrics
+import artifacts
+import session_store
+import asset_cache
+import page_watchdog
+import result_changes
+
+# Consecutive failed resumes before the RVSQ context is thrown away
+MAX_RESUME_ATTEMPTS = 3
+
+BONJOUR_SANTE_URL = 'https://bonjour-sante.ca/uno/clinique'
+
+# Finds the best booking control in one round trip and tags it for a
+# trusted click: a "Réserver" / "Sélectionner" / "Choisir" button first
+# (matched like get_by_text: substring, case and extra whitespace ignored),
+# then the first HH:MM time slot
+SLOT_CANDIDATES_SCRIPT = """
+({labels, token}) => {
+    const visible = el => {
+        const style = window.getComputedStyle(el);
+        const rect = el.getBoundingClientRect();
+        return style.display !== 'none' && style.visibility !== 'hidden' && rect.width > 0 && rect.height > 0;
+    };
+    const controls = Array.from(document.querySelectorAll('button, a, input[type="button"], input[type="submit"], [role="button"], li, span, div'))
+        .filter(el => el.children.length === 0 || el.matches('button, a'));
+    const text = el => (el.innerText || el.value || '').replace(/\\s+/g, ' ').trim();
+    const pick = labels.map(label => label.toLowerCase())
+            .map(label => controls.find(el => text(el).toLowerCase().includes(label) && visible(el))).find(Boolean)
+        || controls.find(el => /^\\d{1,2}:\\d{2}$/.test(text(el)) && visible(el));
+    if (!pick) return null;
+    pick.setAttribute('data-meulade-slot', token);
+    return text(pick);
+}
+"""
+SLOT_LABELS = ["Réserver", "Sélectionner", "Choisir"]
+
+@metrics.timed('step_seconds', step='click_slot')
+async def try_click_slot(page, timeout=10000):
     log_message("[RVSQ] Attempting to auto-click appointment...")
     try:
         # Priority 0: Click on the clinic link (.h-selectClinic)
         clinic_link = page.locator('a.h-selectClinic').first
-        if clinic_link.is_visible():
-            clinic_link.click()
+        if await clinic_link.is_visible():
+            # Probing before the clinic postback is back would find the old page's buttons
+            try:
+                async with page.expect_response(lambda response: response.request.method == 'POST', timeout=timeout):
+                    await clinic_link.click()
+                await page.wait_for_load_state('domcontentloaded')
+            except PlaywrightTimeoutError:
+                log_message("[RVSQ] No clinic postback seen, probing anyway...")
             log_message("[RVSQ] Clicked clinic link")
-            # Wait for next step (time selection)
-            page.wait_for_load_state('networkidle')
-            page.wait_for_timeout(2000)
-
-        # Priority 1: Explicit "Réserver" or "Sélectionner"
-        for text in ["Réserver", "Sélectionner", "Choisir"]:
-            if page.get_by_text(text).first.is_visible():
-                page.get_by_text(text).first.click()
-                log_message(f"[RVSQ] Clicked '{text}'")
-                return True
-
-        # Priority 2: Time pattern (risky, might click clock, but RVSQ usually has time buttons)
-        # We try to find something that looks like a time button
-        # Using a regex for HH:MM
-        time_slot = page.get_by_text(re.compile(r"^\d{1,2}:\d{2}$")).first
-        if time_slot.is_visible():
-             time_slot.click()
-             log_message("[RVSQ] Clicked time slot")
-             return True
 
-        return False
+        # Priority 1 and 2 probed together, as soon as the next step renders
+        token = str(random.getrandbits(32))
+        try:
+            handle = await page.wait_for_function(
+                SLOT_CANDIDATES_SCRIPT,
+                arg={'labels': SLOT_LABELS, 'token': token},
+                timeout=timeout,
+                polling=100
+            )
+        except Exception:
+            log_message("[RVSQ] No booking button found")
+            return False
+        label = await handle.json_value()
+        await page.click(f'[data-meulade-slot="{token}"]')
+        log_message(f"[RVSQ] Clicked '{label}'")
+        return True
     except Exception as e:
         log_message(f"[RVSQ] Auto-click failed: {e}")
         return False
 
-def slot_found(page):
-    log_message("🎉 SLOT FOUND! 🎉")
-    print("🎉 SLOT FOUND! 🎉")
+def beep():
     if winsound:
         winsound.Beep(1000, 500)
         winsound.Beep(2000, 500)
@@ -61,11 +97,23 @@ def slot_found(page):
         winsound.Beep(2000, 500)
         winsound.Beep(1000, 500)
         winsound.Beep(2000, 500)
+
+# Called with the page URL whenever a slot is found (supervisor.py forwards them to the GUI process)
+slot_listeners = []
+
+@metrics.timed('step_seconds', step='slot_found')
+async def slot_found(page, personal_info=None):
+    log_message("🎉 SLOT FOUND! 🎉")
+    print("🎉 SLOT FOUND! 🎉")
+    for listener in slot_listeners:
+        listener(page.url)
+    # winsound.Beep blocks, keep it off the event loop
+    asyncio.get_running_loop().run_in_executor(None, beep)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    screenshot_path = os.path.join("screenshots", f"slot_found_{timestamp}.png")
+    writer = artifacts.get_writer("screenshots", personal_info)
 
     # Mask sensitive info before screenshot
-    page.evaluate("""
+    await page.evaluate("""
         const selectors = [
             '#ctl00_ContentPlaceHolderMP_AssureForm_FirstName',
             '#ctl00_ContentPlaceHolderMP_AssureForm_LastName',
@@ -89,395 +137,568 @@ def slot_found(page):
         });
     """)
 
-    page.screenshot(path=screenshot_path, full_page=True)
-    log_message(f"Screenshot saved: {screenshot_path}")
-
+    # Only the capture happens here; encoding and disk writes run on the artifact thread
+    screenshot, html = await asyncio.gather(page.screenshot(full_page=True), page.content())
+    writer.save_screenshot(f"slot_found_{timestamp}", screenshot)
     # Save full HTML content
-    html_path = os.path.join("screenshots", f"slot_found_{timestamp}.html")
-    with open(html_path, "w", encoding="utf-8") as f:
-        f.write(page.content())
-    log_message(f"HTML saved: {html_path}")
+    writer.save_html(f"slot_found_{timestamp}", html)
 
+async def save_error_screenshot(page, name, personal_info, directory="error_screenshots"):
+    """Capture the page for later inspection; never raises."""
+    if page is None or page.is_closed():
+        return
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        screenshot = await page.screenshot(full_page=True)
+        artifacts.get_writer(directory, personal_info).save_screenshot(f"{name}_{timestamp}", screenshot)
+    except Exception as screenshot_error:
+        log_message(f"Could not save error screenshot: {screenshot_error}")
+
+
+class HubFrame:
+    """Cached handle on the Bonjour Santé hub iframe, refreshed if it gets detached."""
+    SELECTOR = "iframe[src*='hub.bonjour-sante.ca']"
+
+    def __init__(self, page):
+        self.page = page
+        self.frame = None
+
+    async def get(self):
+        if self.frame is None or self.frame.is_detached():
+            handle = await self.page.wait_for_selector(self.SELECTOR)
+            self.frame = await handle.content_frame()
+        return self.frame
+
+def context_setup(site, config):
+    """Per-context hooks, installed once by the pool when a context is created."""
+    personal_info = config['personal_info']
+    async def setup(context):
+        resources = {}
+        if personal_info.get('default_timeout_ms'):
+            context.set_default_timeout(int(personal_info['default_timeout_ms']))
+        # Routes run last-registered first: the cache only sees what the filter lets through
+        if personal_info.get('asset_cache', True):
+            asset_cache.configure(personal_info)
+            resources['cache'] = await asset_cache.install(context, site)
+        if personal_info.get('block_resources', True):
+            resources['filter'] = await resource_filter.install(context, site, config.get('resource_rules', {}).get(site))
+        return resources
+    return setup
+
+def restore_args(pool, key, site, personal_info):
+    """
+    Context arguments restoring the saved cookies and consent/clearance
+    local storage of `site`, so a new context skips the clearance challenge
+    and consent banners. Empty when the context already exists or nothing is saved.
+    """
+    if not personal_info.get('reuse_sessions', True) or pool.is_live(key):
+        return {}
+    state = session_store.load(site, personal_info.get('session_max_age_hours', session_store.DEFAULT_MAX_AGE_HOURS))
+    if state is None:
+        return {}
+    log_message(f"[Session] Restoring saved session for {site}")
+    return {'storage_state': state}
+
+async def save_session(context, site, personal_info):
+    """Snapshot the context once it got through to the search form."""
+    if not personal_info.get('reuse_sessions', True):
+        return
+    try:
+        if session_store.save(site, await context.storage_state(), personal_info.get('session_max_age_hours', session_store.DEFAULT_MAX_AGE_HOURS)):
+            log_message(f"[Session] Saved session for {site}")
+    except Exception as e:
+        log_message(f"[Session] Could not save session for {site}: {e}")
+
+def back_off(breaker, kind):
+    """record_failure, also dropping the saved session once the site challenges it."""
+    if kind == circuit.CHALLENGE:
+        session_store.invalidate(breaker.site, "challenged")
+    return breaker.record_failure(kind)
+
+async def paced_wait(page, dog, pacer, site):
+    """Wait the pacer's delay before the next poll, without tripping the watchdog."""
+    delay = pacer.next_delay(site)
+    dog.expect(delay / 1000, 'pacing')
+    await page.wait_for_timeout(delay)
+
+def set_polling(resources, polling):
+    """Third-party scripts and consent widgets are only blocked once the search form is up."""
+    if resources and resources.get('filter'):
+        resources['filter'].polling = polling
+
+async def release_context(pool, key, context, page):
+    """Close our page and give the context back to the pool, which closes it."""
+    resources = pool.extra(key)
+    if resources and resources.get('filter'):
+        log_message(f"[Filter] {key}: {resources['filter'].summary()}")
+    if resources and resources.get('cache'):
+        log_message(f"[Cache] {resources['cache'].summary()}")
+    try:
+        if page and not page.is_closed():
+            await page.close()
+    except Exception as e:
+        log_message(f"Error closing page: {e}")
+    await pool.release(key, context, recycle=True)
 
-def run_automation_rvsq(config, search_running):
+async def run_automation_rvsq_async(config, search_running, autobook=False, context_key='rvsq'):
     # Create screenshots directories
     for directory in ["screenshots", "error_screenshots"]:
         if not os.path.exists(directory):
             os.makedirs(directory)
     
-    with sync_playwright() as playwright:
-        browser = None
-        context = None
-        while search_running.get():
-            try:
+    pool = await get_engine().get_pool(config['personal_info'].get('launch_profile'))
+    personal_info = config['personal_info']
+    pacer = pacing.get_pacer(personal_info)
+    breaker = circuit.get_breaker('rvsq')
+    context = None
+    page = None
+    flow_state = {}
+    failures = 0
+    restored = False
+    session_saved = False
+    dog = page_watchdog.from_config('rvsq', context_key, personal_info).start()
+    tracker = result_changes.ResultTracker('rvsq', context_key)
+    while search_running.get():
+        try:
+            if context is None:
                 log_message("[DEBUG] Starting browser automation...")
                 
-                # Simplified path handling
-                playwright_paths = get_playwright_path()
-                launch_args = {
-                    'headless': False,
-                    'args': [
-                        '--disable-redirect-limits',
-                        '--disable-blink-features=AutomationControlled'
-                    ]
-                }
-                
-                if playwright_paths:
-                    os.environ['PLAYWRIGHT_BROWSERS_PATH'] = playwright_paths['browser_path']
-                
-                # Use persistent context to save cookies (Cloudflare clearance)
-                user_data_dir = os.path.join(os.getcwd(), 'browser_data', 'rvsq')
-                log_message("[RVSQ] Launching browser with persistent context...")
-                context = playwright.chromium.launch_persistent_context(user_data_dir, **launch_args)
-
-                # Remove navigator.webdriver
-                context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                
-                context.set_default_timeout(60000) # increase from 30 sec to 60 secs for general timeout
-                page = context.pages[0] if context.pages else context.new_page()
-
-                log_message("[RVSQ] Navigating to form page...")
-                page.goto(
-                    'https://rvsq.gouv.qc.ca/prendrerendezvous/Principale.aspx',
-                    timeout=60000,
-                    wait_until='networkidle'
-                )
-                
-                log_message("[RVSQ] Accepting cookies...")
-                page.locator('#btnToutAccepter').click()
-                
-                log_message("[RVSQ] Filling form fields...")
-                personal_info = config['personal_info']
-                page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_FirstName', personal_info['first_name'])
-                page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_LastName', personal_info['last_name'])
-                page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_NAM', personal_info['nam'])
-                page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_CardSeqNumber', personal_info['card_seq_number'])
-                
-                # Fill birth date fields
-                page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_Day', personal_info['birth_day'])
-                page.select_option('#ctl00_ContentPlaceHolderMP_AssureForm_Month', personal_info['birth_month'])
-                page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_Year', personal_info['birth_year'])
-                
-                log_message("[RVSQ] Checking consent checkbox...")
-                page.check('#AssureForm_CSTMT')
-                
-                log_message("[RVSQ] Waiting for Continue button...")
-                page.wait_for_selector('#ctl00_ContentPlaceHolderMP_myButton:not([disabled])')
-                
-                log_message("[RVSQ] Clicking Continue button...")
-                page.click('#ctl00_ContentPlaceHolderMP_myButton')
-                
-                log_message("[RVSQ] Waiting for navigation...")
-                page.wait_for_load_state('networkidle')
-                
-                log_message("[RVSQ] Checking if user has a family doctor...")
-                
-                # Wait a moment for the page to load
-                page.wait_for_load_state('networkidle')
-                page.wait_for_timeout(2000)
-                
-                # Check for family doctor
-                has_family_doctor = page.locator("a.h-SelectAssureBtn.ctx-changer[data-type='1']").is_visible()
-                no_family_doctor = page.locator("text=pas de médecin de famille").is_visible()
-                
-                if no_family_doctor:
-                    log_message("[RVSQ] No family doctor detected, proceeding with appointment search...")
-                    log_message("[RVSQ] Clicking proximity button for no family doctor case...")
-                    page.click("a.h-SelectAssureBtn.ctx-changer[data-type='3']")
-                elif has_family_doctor:
-                    log_message("[RVSQ] Family doctor detected, proceeding with appointment search...")
-                    page.click("a.h-SelectAssureBtn.ctx-changer[data-type='1']")
-                else:
-                    log_message("[RVSQ] Could not determine family doctor status")
-                    return
-                
-                log_message("[RVSQ] Waiting for dropdown...")
-                page.wait_for_selector('#consultingReason', state='visible', timeout=60000)
-                page.wait_for_timeout(2000)
-                
-                log_message("[RVSQ] Selecting Consultation Reason...")
-                reason_id = personal_info.get('reason_id', 'ac2a5fa4-8514-11ef-a759-005056b11d6c')
-                page.click('#consultingReason')
-                page.select_option('#consultingReason', reason_id)
-                
-                if not has_family_doctor:
-                    log_message("[RVSQ] Setting 50km radius...")
-                    page.wait_for_selector('#perimeterCombo', state='visible')
-                    page.wait_for_timeout(1000)
-                
-                log_message("[RVSQ] Clicking 'Rechercher' button...")
-                page.click('button:has-text("Rechercher")')
-                page.wait_for_load_state('networkidle')
-                
-                if has_family_doctor:
-                    log_message("[RVSQ] Clicking GMF button...")
-                    page.click('div.thumbnail.tmbArrow.tmbBtn.h-butType2dot2:has-text("Prendre rendez-vous avec un professionnel de la santé de mon groupe de médecine de famille (GMF)")')
-                    
-                    log_message("[RVSQ] Clicking 'Rechercher' again...")
-                    page.click('button:has-text("Rechercher")')
-                    page.wait_for_load_state('networkidle')
-                    page.click('div.thumbnail.tmbArrow.tmbBtn.h-butType3:has-text("Prendre rendez-vous dans une clinique à proximité")')
-                
-                elif not has_family_doctor:
-                    page.wait_for_load_state('networkidle')
-                
-                    log_message("[RVSQ] Clicking 'Rechercher' again...")
-                    page.click('button:has-text("Rechercher")')
-                    page.wait_for_load_state('networkidle')
-                
-                
-                
+                # One shared Chromium, an isolated context for this site
+                log_message("[RVSQ] Opening browser context...")
+                session_args = restore_args(pool, context_key, 'rvsq', personal_info)
+                context = await pool.acquire(context_key, setup=context_setup('rvsq', config), **session_args)
+                page = await context.new_page()
+                dog.attach(page, context)
+                tracker.reset()
+                metrics.inc('contexts_opened_total', site='rvsq')
+                flow_state = {}
+                restored = bool(session_args)
+                session_saved = False
+            resources = pool.extra(context_key)
+
+            # Resume from the nearest checkpoint instead of replaying the whole flow
+            set_polling(resources, False)
+            dog.beat('reach_search')
+            with metrics.timer('step_seconds', site='rvsq', step='reach_search'):
+                await rvsq_flow.reach_search(page, personal_info, flow_state)
+            set_polling(resources, True)
+            failures = 0
+            if not session_saved:
+                await save_session(context, 'rvsq', personal_info)
+                session_saved = True
+                restored = False
+
+            # In 'http' mode the search postback is captured once from the browser,
+            # then replayed without rendering until the session expires
+            poll_mode = personal_info.get('poll_mode', 'browser')
+            http_poller = None
+            while search_running.get():  # Check if we should continue running
                 try:
-                    page.select_option('#perimeterCombo', '0')
-                except:
-                    try:
-                        page.click('#perimeterCombo')
-                        page.select_option('#perimeterCombo', value='0')
-                    except:
-                        page.evaluate('document.getElementById("perimeterCombo").value = "0"')
+                    # Wait out an open circuit before hitting the site again
+                    dog.expect(breaker.wait_time(), 'circuit')
+                    await circuit.wait_until_allowed(breaker, search_running)
+                    if not search_running.get():
+                        break
+                    cycle_start = time.perf_counter()
+                    dog.beat('poll')
+                    if http_poller:
+                        log_message("[RVSQ] Searching for slots (HTTP)...")
+                        with metrics.timer('step_seconds', site='rvsq', step='http_poll'):
+                            status, clinics_count = await http_poller.poll()
+                        metrics.inc('polls_total', site='rvsq', mode='http', result=status)
+                        if status == classifier.NO_SLOTS:
+                            metrics.observe('cycle_seconds', time.perf_counter() - cycle_start, site='rvsq')
+                            log_message("[RVSQ] No slots available")
+                            breaker.record_success()
+                            pacer.record('rvsq', False)
+                            await paced_wait(page, dog, pacer, 'rvsq')
+                            continue
+                        if status in (circuit.THROTTLE, circuit.CHALLENGE):
+                            delay = back_off(breaker, status)
+                            log_message(f"[RVSQ] Site is pushing back ({status}), backing off {int(delay)}s...")
+                            dog.expect(delay, 'backoff')
+                            await circuit.pause(delay, search_running)
+                            continue
+                        if status == classifier.SLOTS:
+                            log_message(f"[RVSQ] HTTP poll found {clinics_count} clinic(s), confirming in browser...")
+                        else:
+                            log_message("[RVSQ] HTTP session expired, falling back to browser...")
+                        http_poller = None
 
+                    log_message("[RVSQ] Searching for slots...")
 
-                while search_running.get():  # Check if we should continue running
+                    # Aggressively fill postal code
+                    fill_start = time.perf_counter()
                     try:
-                        log_message("[RVSQ] Searching for slots...")
-
-                        # Aggressively fill postal code
-                        try:
-                            # Use nuclear option to ensure field is cleared and updated
-                            page.click('#PostalCode')
-                            # Ensure we click and wait briefly before typing
-                            page.wait_for_timeout(random.randint(100, 300))
-                            page.keyboard.press('Control+A')
-                            page.keyboard.press('Backspace')
-                            page.keyboard.type(personal_info['postal_code'].upper())
-                        except Exception as fill_error:
-                            log_message(f"[RVSQ] Error filling postal code: {fill_error}")
-                            # Keep going, maybe it's already filled
-
-                        # Check if "Rechercher" button exists, if not maybe we need to find "Modifier"
-                        search_btn = page.locator('button.h-SearchButton.btn.btn-primary:has-text("Rechercher")')
-                        if not search_btn.is_visible():
-                             log_message("[RVSQ] Search button not visible, checking for errors or layout change...")
-                             # Attempt to recover or just wait
-
-                        # Add random delay before clicking search to avoid detection
-                        # Reduced delay to be less than 10% of typical cycle (assuming cycle is few seconds)
-                        page.wait_for_timeout(random.randint(200, 500))
-                        page.click('button.h-SearchButton.btn.btn-primary:has-text("Rechercher")')
-
-                        try:
-                            page.wait_for_load_state('networkidle', timeout=10000)
-                        except:
-                            pass # Continue if networkidle times out
-
-                        page.wait_for_timeout(2000)
-
-                        no_slots_element = page.locator('#clinicsWithNoDisponibilities')
-                        no_slots_text = page.locator('text=Aucun rendez-vous rpondant')
-                        no_slots_full_text = page.locator('text=Aucun rendez-vous répondant à vos critères de recherche n\'est disponible pour le moment.')
-                        clinic_section = page.locator('text=Les cliniques suivantes offrent des disponibilités pour votre rendez-vous :')
-                        
-                        has_negative_indicators = (
-                            no_slots_text.is_visible() or
-                            no_slots_element.is_visible() or
-                            no_slots_full_text.is_visible()
-                        )
-
-                        if has_negative_indicators:
-                            log_message("[RVSQ] No slots available")
-                        elif clinic_section.is_visible():
-                            # Check if there are actually clinics listed
-                            clinics_count = page.locator('#ClinicList li').count()
-                            if clinics_count > 0:
-                                slot_found(page)
-                                try_click_slot(page)
-                                page.wait_for_timeout(240000) # wait 4 minutes
-                            else:
-                                log_message("[RVSQ] Clinic section visible but no clinics found (False Positive)")
-
-                        if not search_running.get():
-                            break
-
-                        page.wait_for_timeout(random.randint(1000, 5000))
-                    except Exception as loop_error:
-                         log_message(f"[RVSQ] Error in search loop: {str(loop_error)}")
-                         page.wait_for_timeout(5000) # Wait a bit before retrying
-                         continue
-                        
-                    
-            except Exception as e:
-                log_message(f"\n[ERROR] An error occurred: {str(e)}")
-                print(f"\n[ERROR] An error occurred: {str(e)}")
-                if page:
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    error_path = os.path.join("error_screenshots", f"rvsq_error_{timestamp}.png")
-                    page.screenshot(path=error_path, full_page=True)
-            finally:
+                        # Use nuclear option to ensure field is cleared and updated
+                        await page.click('#PostalCode')
+                        # Ensure we click and wait briefly before typing
+                        await page.wait_for_timeout(random.randint(100, 300))
+                        await page.keyboard.press('Control+A')
+                        await page.keyboard.press('Backspace')
+                        await page.keyboard.type(personal_info['postal_code'].upper())
+                    except Exception as fill_error:
+                        log_message(f"[RVSQ] Error filling postal code: {fill_error}")
+                        metrics.inc('errors_total', site='rvsq', type='fill')
+                        # Keep going, maybe it's already filled
+                    metrics.observe('step_seconds', time.perf_counter() - fill_start, site='rvsq', step='fill')
+
+                    # Check if "Rechercher" button exists, if not maybe we need to find "Modifier"
+                    search_btn = page.locator('button.h-SearchButton.btn.btn-primary:has-text("Rechercher")')
+                    if not await search_btn.is_visible():
+                         log_message("[RVSQ] Search button not visible, checking for errors or layout change...")
+                         # Attempt to recover or just wait
+
+                    # Add random delay before clicking search to avoid detection
+                    # Reduced delay to be less than 10% of typical cycle (assuming cycle is few seconds)
+                    await page.wait_for_timeout(random.randint(200, 500))
+                    # Returns as soon as the results render, bounded at 10 s
+                    with metrics.timer('step_seconds', site='rvsq', step='search'):
+                        if poll_mode == 'http':
+                            captured = await rvsq_flow.search_and_wait(page, lambda: rvsq_http.capture_search(page, 'button.h-SearchButton.btn.btn-primary:has-text("Rechercher")'))
+                            http_poller = rvsq_http.RvsqHttpPoller(context.request, captured)
+                        else:
+                            await rvsq_flow.search_and_wait(page, lambda: page.click('button.h-SearchButton.btn.btn-primary:has-text("Rechercher")'))
+
+                    # One round trip; the indicators are only gathered if the results changed
+                    with metrics.timer('step_seconds', site='rvsq', step='classify'):
+                        fingerprint, result = await classifier.check_rvsq(page, tracker.expected())
+                    result, changed = tracker.update(fingerprint, result)
+                    metrics.inc('polls_total', site='rvsq', mode='browser', result=result.status)
+                    metrics.observe('cycle_seconds', time.perf_counter() - cycle_start, site='rvsq')
+
+                    if result.status in (classifier.NO_SLOTS, classifier.SLOTS):
+                        breaker.record_success()
+                        pacer.record('rvsq', result.status == classifier.SLOTS)
+                    else:
+                        # A challenge or throttling page classifies as unknown/error
+                        kind = await circuit.detect_block(page)
+                        if kind or result.status == classifier.ERROR:
+                            delay = back_off(breaker, kind or circuit.ERROR)
+                            log_message(f"[RVSQ] {kind or result.detail}, backing off {int(delay)}s...")
+                            dog.expect(delay, 'backoff')
+                            await circuit.pause(delay, search_running)
+                            continue
+
+                    if result.status == classifier.NO_SLOTS:
+                        log_message("[RVSQ] No slots available")
+                    elif result.status == classifier.SLOTS:
+                        metrics.inc('slots_found_total', site='rvsq')
+                        dog.beat('slot')
+                        detected_at = time.perf_counter()
+                        if autobook:
+                            # Book first: the slot can go while evidence is being written
+                            clicked = await try_click_slot(page)
+                            metrics.observe('detection_to_click_seconds', time.perf_counter() - detected_at, site='rvsq', mode='book_first')
+                            try:
+                                if changed:
+                                    await slot_found(page, personal_info)
+                            except Exception as evidence_error:
+                                log_message(f"[RVSQ] Could not record the slot: {evidence_error}")
+                        else:
+                            # Same slots as the last capture: no new evidence to save
+                            if changed:
+                                await slot_found(page, personal_info)
+                            clicked = await try_click_slot(page)
+                            metrics.observe('detection_to_click_seconds', time.perf_counter() - detected_at, site='rvsq', mode='evidence_first')
+                        metrics.inc('slot_clicks_total', site='rvsq', result='clicked' if clicked else 'missed')
+                        await dog.hold(240, search_running) # wait 4 minutes
+                    elif result.status == classifier.ERROR:
+                        log_message(f"[RVSQ] Error page after search: {result.detail}")
+                    else:
+                        log_message(f"[RVSQ] {result.detail}")
+
+                    if not search_running.get():
+                        break
+
+                    await paced_wait(page, dog, pacer, 'rvsq')
+                except Exception as loop_error:
+                     log_message(f"[RVSQ] Error in search loop: {str(loop_error)}")
+                     metrics.inc('errors_total', site='rvsq', type=type(loop_error).__name__)
+                     http_poller = None
+                     current = await rvsq_flow.detect_step(page, flow_state)
+                     if current is None or current.name != 'search':
+                         log_message("[RVSQ] Left the search form, resuming flow...")
+                         break
+                     # Back off exponentially while errors keep coming
+                     delay = back_off(breaker, await circuit.detect_block(page) or circuit.ERROR)
+                     dog.expect(delay, 'backoff')
+                     await circuit.pause(delay, search_running)
+                     continue
+
+        except rvsq_flow.FlowError as e:
+            log_message(f"[RVSQ] {e}")
+            break
+        except Exception as e:
+            log_message(f"\n[ERROR] An error occurred: {str(e)}")
+            print(f"\n[ERROR] An error occurred: {str(e)}")
+            metrics.inc('errors_total', site='rvsq', type=type(e).__name__)
+            await save_error_screenshot(page, "rvsq_error", personal_info)
+            failures += 1
+            delay = breaker.record_failure(circuit.ERROR)
+            if restored:
+                # The restored session did not get us to the form, start clean next time
+                session_store.invalidate('rvsq', "restored session failed")
+                restored = False
+            # Only throw the context away when resuming keeps failing or the page is gone
+            if page is None or page.is_closed() or failures >= MAX_RESUME_ATTEMPTS:
+                log_message("[RVSQ] Page unrecoverable, relaunching browser context...")
+                metrics.inc('relaunches_total', site='rvsq')
                 if context:
-                    context.close()
-                # browser is not used with persistent context (it's part of context)
-
-def run_automation_bonjoursante(config, search_running, autobook):
+                    await release_context(pool, context_key, context, page)
+                context = None
+                page = None
+                failures = 0
+            else:
+                log_message(f"[RVSQ] Resuming from last checkpoint (attempt {failures}/{MAX_RESUME_ATTEMPTS})...")
+            dog.expect(delay, 'backoff')
+            await circuit.pause(delay, search_running)
+    dog.stop()
+    if context:
+        # End of the flow or of the job's turn: a waiting job must not keep its context open
+        await release_context(pool, context_key, context, page)
+
+async def run_automation_bonjoursante_async(config, search_running, autobook, context_key='bonjoursante'):
     # Create screenshots directories
     for directory in ["screenshots", "error_screenshots"]:
         if not os.path.exists(directory):
             os.makedirs(directory)
     
-    with sync_playwright() as playwright:
-        browser = None
-        context = None
-        while search_running.get():
-            try:
-                log_message("[BonjourSante] Starting browser automation...")
-                
-                # Simplified path handling
-                playwright_paths = get_playwright_path()
-                launch_args = {
-                    'headless': False,
-                    'args': [
-                        '--disable-redirect-limits',
-                        '--disable-blink-features=AutomationControlled'
-                    ]
-                }
-                
-                if playwright_paths:
-                    os.environ['PLAYWRIGHT_BROWSERS_PATH'] = playwright_paths['browser_path']
-                
-                # Use persistent context
-                user_data_dir = os.path.join(os.getcwd(), 'browser_data', 'bonjoursante')
-                log_message("[BonjourSante] Launching browser with persistent context...")
-                context = playwright.chromium.launch_persistent_context(user_data_dir, **launch_args)
-                context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                
-                context.set_default_timeout(60000) # increase from 30 sec to 60 secs for general timeout
-                page = context.pages[0] if context.pages else context.new_page()
-                
-                log_message("[BonjourSante] Navigating to form page...")
-                page.goto(
-                    'https://bonjour-sante.ca/uno/clinique',
-                    timeout=60000
-                )
-                
+    pool = await get_engine().get_pool(config['personal_info'].get('launch_profile'))
+    breaker = circuit.get_breaker('bonjoursante')
+    context = None
+    page = None
+    dog = page_watchdog.from_config('bonjoursante', context_key, config['personal_info']).start()
+    tracker = result_changes.ResultTracker('bonjoursante', context_key)
+    while search_running.get():
+        restored = False
+        delay = 0
+        try:
+            dog.expect(breaker.wait_time(), 'circuit')
+            await circuit.wait_until_allowed(breaker, search_running)
+            if not search_running.get():
+                break
+            log_message("[BonjourSante] Starting browser automation...")
+            
+            # One shared Chromium, an isolated context for this site
+            log_message("[BonjourSante] Opening browser context...")
+            session_args = restore_args(pool, context_key, 'bonjoursante', config['personal_info'])
+            context = await pool.acquire(context_key, setup=context_setup('bonjoursante', config), **session_args)
+            page = await context.new_page()
+            dog.attach(page, context)
+            dog.beat('form')
+            tracker.reset()
+            metrics.inc('contexts_opened_total', site='bonjoursante')
+            restored = bool(session_args)
+            resources = pool.extra(context_key)
+            set_polling(resources, False)
+            form_start = time.perf_counter()
+            
+            log_message("[BonjourSante] Navigating to form page...")
+            await page.goto(
+                config['personal_info'].get('bonjoursante_url', BONJOUR_SANTE_URL),
+                timeout=60000
+            )
+            
+            consent_button = page.locator('#didomi-notice-agree-button')
+            if restored:
+                # Consent is usually part of the restored session
+                try:
+                    await consent_button.click(timeout=5000)
+                    log_message("[BonjourSante] Accepting cookies...")
+                except Exception:
+                    pass
+            else:
                 log_message("[BonjourSante] Accepting cookies...")
-                page.locator('#didomi-notice-agree-button').click()
-                
-                page.locator("div[data-test='postalCodeCategoryButton']").click() # click on region clinic
-                log_message("[BonjourSante] Filling form fields...")
-                personal_info = config['personal_info']
-                page.fill('#patient-nam-input', personal_info['card_seq_number'])
-                page.fill('#postal-code-search-input', personal_info['postal_code'])
-                page.locator("button[data-test='searchPostalCodeButton']").click()
-
-                # Wait a moment for the page to load
-                page.wait_for_selector("iframe[src*='hub.bonjour-sante.ca']")
-                
-                # Fill fields
-                log_message("[BonjourSante] Filling form fields part 2...")
-                frameLocator = page.frame_locator("iframe[src*='hub.bonjour-sante.ca']")
-                frameLocator.locator('input#healthInsuranceNumber').fill("".join(personal_info['nam'].split()))
-                frameLocator.locator('input#healthInsuranceNumberSequence').fill(personal_info['card_seq_number'])
-                frameLocator.locator('input#firstName').fill(personal_info['first_name'])
-                frameLocator.locator('input#lastName').fill(personal_info['last_name'])
-                frameLocator.locator('button#confirm').click()
-                # Wait a moment for the page to load
-                page.wait_for_selector("iframe[src*='hub.bonjour-sante.ca']")
-                log_message("[BonjourSante] Select Options")
-                frameLocator = page.frame_locator("iframe[src*='hub.bonjour-sante.ca']")
-                frameLocator.locator('mat-radio-button#mat-radio-2').click()
-                date = datetime.today().strftime('%Y-%m-%d')
-                frameLocator.locator('#mat-input-0').fill(date)
-                slider = frameLocator.locator("input[type='range']")
-                slider.evaluate("(element, value) => element.value = value", "2") # set range to 50km
-                slider.evaluate("(element) => element.dispatchEvent(new Event('input'))")
-                slider.evaluate("(element) => element.dispatchEvent(new Event('change'))")
-                frameLocator.locator('button#confirm').click()
-                frameLocator.locator('button#continue').click()
-                while search_running.get(): 
-                    frameLocator.locator('div.title-criteria-container').wait_for(state = 'visible') # wait for "Résultats de recherche" to load
-                    log_message("[BonjourSante] Searching for slots...")
-                    iframe_content = page.query_selector("iframe[src*='hub.bonjour-sante.ca']").content_frame().content()
-                    # print('Aucun rendez-vous ne correspond à vos critères de recherche' in iframe)
-                    if frameLocator.locator('app-locked-walkin-availability[data-test="locked-walkin-availability"]').count() > 0 or 'Consultation réservée pour vous' in iframe_content  :
-                        slot_found(page)
-                        if (autobook):
-                            frameLocator.locator('button[data-test="confirm-selection-button"]').click()
-                            #load the next page
-                            frameLocator.locator('#confirmation-checkbox-input').wait_for(state='visible')
-                            frameLocator.locator('input#cellPhone').fill(format_phone_number(personal_info['cellphone']))
-                            frameLocator.locator('input#email').fill((personal_info['email']))
-                            frameLocator.locator('select#reasons').select_option(value='28') # Reason : Autres
-                            frameLocator.locator('#confirmation-checkbox-input').check()
-                            frameLocator.locator('#confirm').click()
-                            frameLocator.locator('button[data-test="registration-dialog-submit-btn"]').click()
-                            frameLocator.locator('lib-alert').wait_for(state='visible')
-                            search_running.set(False)
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            screenshot_path = os.path.join("screenshots", f"slot_confirmed_{timestamp}.png")
-
-                            # Mask sensitive info before screenshot
-                            page.evaluate("""
-                                const selectors = [
-                                    'input',
-                                    'select',
-                                    '.sensitive'
-                                ];
-                                selectors.forEach(sel => {
-                                    const els = document.querySelectorAll(sel);
-                                    els.forEach(el => {
-                                        el.style.filter = 'blur(5px)';
-                                    });
+                await consent_button.click()
+            
+            await page.locator("div[data-test='postalCodeCategoryButton']").click() # click on region clinic
+            log_message("[BonjourSante] Filling form fields...")
+            personal_info = config['personal_info']
+            await page.fill('#patient-nam-input', personal_info['card_seq_number'])
+            await page.fill('#postal-code-search-input', personal_info['postal_code'])
+            await page.locator("button[data-test='searchPostalCodeButton']").click()
+
+            # Wait a moment for the page to load
+            await page.wait_for_selector("iframe[src*='hub.bonjour-sante.ca']")
+            
+            # Fill fields
+            log_message("[BonjourSante] Filling form fields part 2...")
+            frameLocator = page.frame_locator("iframe[src*='hub.bonjour-sante.ca']")
+            await frameLocator.locator('input#healthInsuranceNumber').fill("".join(personal_info['nam'].split()))
+            await frameLocator.locator('input#healthInsuranceNumberSequence').fill(personal_info['card_seq_number'])
+            await frameLocator.locator('input#firstName').fill(personal_info['first_name'])
+            await frameLocator.locator('input#lastName').fill(personal_info['last_name'])
+            await frameLocator.locator('button#confirm').click()
+            # Wait a moment for the page to load
+            await page.wait_for_selector("iframe[src*='hub.bonjour-sante.ca']")
+            log_message("[BonjourSante] Select Options")
+            frameLocator = page.frame_locator("iframe[src*='hub.bonjour-sante.ca']")
+            await frameLocator.locator('mat-radio-button#mat-radio-2').click()
+            date = datetime.today().strftime('%Y-%m-%d')
+            await frameLocator.locator('#mat-input-0').fill(date)
+            slider = frameLocator.locator("input[type='range']")
+            await slider.evaluate("(element, value) => element.value = value", "2") # set range to 50km
+            await slider.evaluate("(element) => element.dispatchEvent(new Event('input'))")
+            await slider.evaluate("(element) => element.dispatchEvent(new Event('change'))")
+            await frameLocator.locator('button#confirm').click()
+            await frameLocator.locator('button#continue').click()
+            metrics.observe('step_seconds', time.perf_counter() - form_start, site='bonjoursante', step='form')
+            await save_session(context, 'bonjoursante', personal_info)
+            restored = False
+            set_polling(resources, True)
+            hub_frame = HubFrame(page)
+            pacer = pacing.get_pacer(personal_info)
+            while search_running.get(): 
+                cycle_start = time.perf_counter()
+                dog.beat('poll')
+                with metrics.timer('step_seconds', site='bonjoursante', step='results'):
+                    await frameLocator.locator('div.title-criteria-container').wait_for(state = 'visible') # wait for "Résultats de recherche" to load
+                dog.expect(breaker.wait_time(), 'circuit')
+                await circuit.wait_until_allowed(breaker, search_running)
+                if not search_running.get():
+                    break
+                log_message("[BonjourSante] Searching for slots...")
+                # One evaluation inside the cached hub frame, indicators only if the results changed
+                with metrics.timer('step_seconds', site='bonjoursante', step='classify'):
+                    fingerprint, result = await classifier.check_bonjoursante(await hub_frame.get(), tracker.expected())
+                result, changed = tracker.update(fingerprint, result)
+                metrics.inc('polls_total', site='bonjoursante', mode='browser', result=result.status)
+                metrics.observe('cycle_seconds', time.perf_counter() - cycle_start, site='bonjoursante')
+                if result.status in (classifier.NO_SLOTS, classifier.SLOTS):
+                    breaker.record_success()
+                    pacer.record('bonjoursante', result.status == classifier.SLOTS)
+                if result.status == classifier.SLOTS:
+                    metrics.inc('slots_found_total', site='bonjoursante')
+                    dog.beat('slot')
+                    if changed:
+                        await slot_found(page, personal_info)
+                    if (autobook):
+                        await frameLocator.locator('button[data-test="confirm-selection-button"]').click()
+                        #load the next page
+                        await frameLocator.locator('#confirmation-checkbox-input').wait_for(state='visible')
+                        await frameLocator.locator('input#cellPhone').fill(format_phone_number(personal_info['cellphone']))
+                        await frameLocator.locator('input#email').fill((personal_info['email']))
+                        await frameLocator.locator('select#reasons').select_option(value='28') # Reason : Autres
+                        await frameLocator.locator('#confirmation-checkbox-input').check()
+                        await frameLocator.locator('#confirm').click()
+                        await frameLocator.locator('button[data-test="registration-dialog-submit-btn"]').click()
+                        await frameLocator.locator('lib-alert').wait_for(state='visible')
+                        search_running.set(False)  # booked: stops every search for this person
+                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+                        # Mask sensitive info before screenshot
+                        await page.evaluate("""
+                            const selectors = [
+                                'input',
+                                'select',
+                                '.sensitive'
+                            ];
+                            selectors.forEach(sel => {
+                                const els = document.querySelectorAll(sel);
+                                els.forEach(el => {
+                                    el.style.filter = 'blur(5px)';
                                 });
-                            """)
-
-                            page.screenshot(path=screenshot_path, full_page=True)
-                            log_message(f"Screenshot saved: {screenshot_path}")
-                            # context.set_default_timeout(240000) # wait for 4 imnutes
-                            # page.wait_for_timeout(240000)
-                            log_message("Booking Confirmed")
-                            break
-                        else:
-                            context.set_default_timeout(240000) # wait for 4 imnutes
-                            page.wait_for_timeout(240000)
-                            log_message('[BonjourSante] Failed to book slot Bonjour Sante, timer expired')
-                            raise RuntimeError('Failed to book slot Bonjour Sante, timer expired')
-                    elif frameLocator.locator('div.t-alert-content').count() > 0 :
-                        log_message("[BonjourSante] Une erreur est survenue lors de la recherche de consultations.")
-                        frameLocator.locator('a.link').click()
-                        frameLocator.locator('button#confirm').click()
-                        page.wait_for_timeout(random.randint(2000, 10000)) # Wait some time before clicking
-                        frameLocator.locator('button#continue').click()
-                    elif 'Aucun rendez-vous ne correspond à vos critères de recherche' in frameLocator.locator("span.label-message").inner_text():
-                        log_message("[BonjourSante] No slots available")
-                        # print("[BonjourSante] No slots available")
-                        frameLocator.locator('[data-test="make-new-search"]').click() #click on Modifier les critères de recherche
-                        # date = datetime.today().strftime('%Y-%m-%d')
-                        # frameLocator.locator('#mat-input-' + str(loops)).fill(date) # get new date
-                        frameLocator.locator('button#confirm').click()
-                        page.wait_for_timeout(random.randint(2000, 10000)) # Wait some time before clicking
-                        frameLocator.locator('button#continue').click()
+                            });
+                        """)
+
+                        artifacts.get_writer("screenshots", personal_info).save_screenshot(f"slot_confirmed_{timestamp}", await page.screenshot(full_page=True))
+                        # context.set_default_timeout(240000) # wait for 4 imnutes
+                        # page.wait_for_timeout(240000)
+                        log_message("Booking Confirmed")
+                        break
                     else:
-                        print('[BonjourSante] Failed to parse Bonjour Sante response')
-                        log_message('[BonjourSante] Failed to parse Bonjour Sante response')
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        screenshot_path = os.path.join("screenshots", f"bonjour_sante_error_{timestamp}.png")
-                        page.screenshot(path=screenshot_path, full_page=True)
-                        log_message(f"Screenshot saved: {screenshot_path}")
-                        raise RuntimeError('Failed to parse Bonjour Sante response')
-
-
-            except Exception as e:
-                log_message(f"\n[ERROR1] An error occurred: {str(e)}")
-                print(f"\n[ERROR1] An error occurred: {str(e)}")
-                if page:
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    error_path = os.path.join("error_screenshots", f"bonjour_sante_error_{timestamp}.png")
-                    page.screenshot(path=error_path, full_page=True)
-            finally:
-                if context:
-                    context.close()
+                        context.set_default_timeout(240000) # wait for 4 imnutes
+                        await dog.hold(240, search_running)
+                        log_message('[BonjourSante] Failed to book slot Bonjour Sante, timer expired')
+                        raise RuntimeError('Failed to book slot Bonjour Sante, timer expired')
+                elif result.status == classifier.ERROR:
+                    log_message("[BonjourSante] Une erreur est survenue lors de la recherche de consultations.")
+                    await frameLocator.locator('a.link').click()
+                    await frameLocator.locator('button#confirm').click()
+                    # Repeated alerts usually mean rate limiting: back off exponentially
+                    backoff = breaker.record_failure(circuit.THROTTLE)
+                    log_message(f"[BonjourSante] Backing off {int(backoff)}s...")
+                    dog.expect(backoff, 'backoff')
+                    await circuit.pause(backoff, search_running)
+                    await frameLocator.locator('button#continue').click()
+                elif result.status == classifier.NO_SLOTS:
+                    log_message("[BonjourSante] No slots available")
+                    # print("[BonjourSante] No slots available")
+                    await frameLocator.locator('[data-test="make-new-search"]').click() #click on Modifier les critères de recherche
+                    # date = datetime.today().strftime('%Y-%m-%d')
+                    # frameLocator.locator('#mat-input-' + str(loops)).fill(date) # get new date
+                    await frameLocator.locator('button#confirm').click()
+                    await paced_wait(page, dog, pacer, 'bonjoursante') # Wait some time before clicking
+                    await frameLocator.locator('button#continue').click()
+                else:
+                    print('[BonjourSante] Failed to parse Bonjour Sante response')
+                    log_message('[BonjourSante] Failed to parse Bonjour Sante response')
+                    await save_error_screenshot(page, "bonjour_sante_error", personal_info, directory="screenshots")
+                    raise RuntimeError('Failed to parse Bonjour Sante response')
+
+
+        except Exception as e:
+            log_message(f"\n[ERROR1] An error occurred: {str(e)}")
+            print(f"\n[ERROR1] An error occurred: {str(e)}")
+            metrics.inc('errors_total', site='bonjoursante', type=type(e).__name__)
+            metrics.inc('relaunches_total', site='bonjoursante')
+            kind = await circuit.detect_block(page) if page else None
+            if kind:
+                log_message(f"[BonjourSante] Site is pushing back ({kind})")
+            await save_error_screenshot(page, "bonjour_sante_error", config['personal_info'])
+            delay = back_off(breaker, kind or circuit.ERROR)
+            if restored:
+                session_store.invalidate('bonjoursante', "restored session failed")
+        finally:
+            # After an error, and at the end of the flow or of the job's turn,
+            # so waiting jobs do not keep contexts open
+            if context:
+                await release_context(pool, context_key, context, page)
+                context = None
+                page = None
+        if delay:
+            dog.expect(delay, 'backoff')
+            await circuit.pause(delay, search_running)
+    dog.stop()
+
+
+def run_automation_rvsq(config, search_running, autobook=False):
+    """Blocking wrapper, runs the RVSQ flow on the shared engine loop."""
+    get_engine().run(run_automation_rvsq_async(config, search_running, autobook))
+
+def run_automation_bonjoursante(config, search_running, autobook):
+    """Blocking wrapper, runs the Bonjour Santé flow on the shared engine loop."""
+    get_engine().run(run_automation_bonjoursante_async(config, search_running, autobook))
+
+async def run_job(job, search_running, base_config):
+    """Run one scheduled job with its own context in the shared browser."""
+    config = job.config(base_config)
+    if job.site == 'rvsq':
+        await run_automation_rvsq_async(config, search_running, job.autobook, context_key=job.name)
+    elif job.site == 'bonjoursante':
+        await run_automation_bonjoursante_async(config, search_running, job.autobook, context_key=job.name)
+    else:
+        raise ValueError(f"Unknown website: {job.site}")
+
+def submit_jobs(config, sites, search_running, autobook=None, max_concurrency=None):
+    """
+    Fan out every (profile, postal code, site) combination from `config`
+    over the shared browser with bounded concurrency.
+    Returns a concurrent.futures.Future resolving to the job statuses.
+    """
+    search_jobs = jobs.build_jobs(config, sites, autobook)
+    max_concurrency = max_concurrency or config['personal_info'].get('max_concurrency', jobs.DEFAULT_MAX_CONCURRENCY)
+    scheduler = jobs.JobScheduler(
+        search_jobs,
+        lambda job, job_running: run_job(job, job_running, config),
+        max_concurrency,
+        jobs.slice_seconds(len(search_jobs), max_concurrency, config['personal_info'])
+    )
+    return get_engine().submit(scheduler.run(search_running))
 
 
 def format_phone_number(number):
     if len(number) == 10 and number.isdigit():
         return f"({number[:3]}) {number[3:6]}-{number[6:]}"
-    raise ValueError("Invalid phone number format")
\ No newline at end of file
+    raise ValueError("Invalid phone number format")
@@ -0,0 +1,247 @@
+import asyncio
+import functools
+import glob
+import importlib.util
+import json
+import os
+import sys
+from logger import log_message
+
+DEFAULT_LAUNCH_ARGS = {
+    'headless': False,
+    'args': [
+        '--disable-redirect-limits',
+        '--disable-blink-features=AutomationControlled'
+    ]
+}
+
+# Keep timers running in pages nobody is looking at, polling must not slow down
+NO_THROTTLING_ARGS = [
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+]
+
+# Lower per-instance memory for unattended servers
+LOW_MEMORY_ARGS = [
+    '--disable-gpu',
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--mute-audio',
+    '--no-first-run',
+    '--renderer-process-limit=4',
+    '--disable-features=Translate,MediaRouter,OptimizationHints',
+    '--js-flags=--max-old-space-size=256',
+]
+
+# 'launch' goes to chromium.launch, 'context' to every browser.new_context
+LAUNCH_PROFILES = {
+    'visible': {
+        'launch': DEFAULT_LAUNCH_ARGS,
+        'context': {},
+    },
+    'headless': {
+        'launch': {
+            'headless': True,
+            'args': DEFAULT_LAUNCH_ARGS['args'] + NO_THROTTLING_ARGS,
+        },
+        'context': {'viewport': {'width': 1280, 'height': 800}},
+    },
+    'lean': {
+        'launch': {
+            'headless': True,
+            'args': DEFAULT_LAUNCH_ARGS['args'] + NO_THROTTLING_ARGS + LOW_MEMORY_ARGS,
+        },
+        'context': {'viewport': {'width': 1024, 'height': 700}, 'device_scale_factor': 1},
+    },
+}
+DEFAULT_PROFILE = 'visible'
+
+def get_launch_profile(name):
+    if name not in LAUNCH_PROFILES:
+        log_message(f"[Pool] Unknown launch profile '{name}', using '{DEFAULT_PROFILE}'")
+        name = DEFAULT_PROFILE
+    return LAUNCH_PROFILES[name]
+
+# Remove navigator.webdriver
+STEALTH_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+def get_playwright_path():
+    """Get the correct path for Playwright resources when bundled"""
+    if getattr(sys, 'frozen', False):
+        return {
+            'browser_path': sys._MEIPASS  # Just use the base directory
+        }
+    return None
+
+# Browser each launch profile starts: headed Chromium, or the headless shell
+REQUIRED_BROWSERS = {
+    'visible': 'chromium',
+    'headless': 'chromium-headless-shell',
+    'lean': 'chromium-headless-shell',
+}
+
+def install_dir_prefix(name):
+    """Playwright installs 'chromium-headless-shell' as 'chromium_headless_shell-<revision>'."""
+    return name.replace('-', '_')
+
+def playwright_package_dir():
+    """Location of the playwright package, found without importing it."""
+    spec = importlib.util.find_spec('playwright')
+    return os.path.dirname(spec.origin) if spec and spec.origin else None
+
+def browsers_dir():
+    """Where Playwright keeps its browsers, following its own lookup rules."""
+    configured = os.environ.get('PLAYWRIGHT_BROWSERS_PATH')
+    if configured == '0':
+        package_dir = playwright_package_dir()
+        return os.path.join(package_dir, 'driver', 'package', '.local-browsers') if package_dir else None
+    if configured:
+        return configured
+    if sys.platform == 'win32':
+        return os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 'ms-playwright')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Caches/ms-playwright')
+    return os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'ms-playwright')
+
+def required_revisions():
+    """{browser name: revision} expected by the installed Playwright, or {} if unknown."""
+    package_dir = playwright_package_dir()
+    if not package_dir:
+        return {}
+    try:
+        with open(os.path.join(package_dir, 'driver', 'package', 'browsers.json')) as f:
+            browsers = json.load(f)['browsers']
+    except (OSError, ValueError, KeyError):
+        return {}
+    return {entry['name']: entry['revision'] for entry in browsers if entry['name'] in REQUIRED_BROWSERS.values()}
+
+@functools.lru_cache(maxsize=None)
+def chromium_installed(profile=None):
+    """
+    True if the browser the launch profile needs is on disk. Looks for the
+    INSTALLATION_COMPLETE marker Playwright writes, instead of launching it.
+    """
+    if getattr(sys, 'frozen', False):
+        return True  # bundled next to the executable by build.py
+    root = browsers_dir()
+    if not root or not os.path.isdir(root):
+        return False
+    name = REQUIRED_BROWSERS.get(profile or DEFAULT_PROFILE, REQUIRED_BROWSERS[DEFAULT_PROFILE])
+    revision = required_revisions().get(name)
+    if revision is None:
+        return bool(glob.glob(os.path.join(root, f"{install_dir_prefix(name)}-*", 'INSTALLATION_COMPLETE')))
+    return os.path.exists(os.path.join(root, f"{install_dir_prefix(name)}-{revision}", 'INSTALLATION_COMPLETE'))
+
+class PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.refcount = 0
+        self.uses = 0
+        self.retired = False
+        self.extra = None
+
+class BrowserPool:
+    """
+    Launches Chromium once and hands out isolated BrowserContexts per key
+    (a site or a profile). Contexts are reference counted; a context is
+    closed once it is retired and its last user releases it.
+    """
+    def __init__(self, playwright, launch_args=None, context_args=None, max_context_uses=25, default_timeout=60000):
+        self.playwright = playwright
+        self.launch_args = launch_args or DEFAULT_LAUNCH_ARGS
+        self.context_args = context_args or {}
+        self.max_context_uses = max_context_uses
+        self.default_timeout = default_timeout
+        self.browser = None
+        self.contexts = {}
+        self._lock = asyncio.Lock()
+        self._create_lock = asyncio.Lock()
+
+    async def get_browser(self):
+        async with self._lock:
+            if self.browser is None or not self.browser.is_connected():
+                playwright_paths = get_playwright_path()
+                if playwright_paths:
+                    os.environ['PLAYWRIGHT_BROWSERS_PATH'] = playwright_paths['browser_path']
+                log_message("[Pool] Launching shared Chromium...")
+                self.contexts.clear()
+                self.browser = await self.playwright.chromium.launch(**self.launch_args)
+                self.browser.on("disconnected", self._on_disconnected)
+            return self.browser
+
+    def _on_disconnected(self, browser):
+        if browser is self.browser:
+            log_message("[Pool] Chromium disconnected, it will be relaunched on next use")
+            self.browser = None
+            self.contexts.clear()
+
+    async def acquire(self, key, setup=None, **context_args):
+        """
+        Return the live context for `key`, creating it if needed.
+        `setup(context)` is awaited once per new context; its result is
+        kept and returned by extra(key).
+        """
+        browser = await self.get_browser()
+        async with self._create_lock:
+            entry = self.contexts.get(key)
+            if entry is None or entry.retired:
+                context = await browser.new_context(**{**self.context_args, **context_args})
+                await context.add_init_script(STEALTH_SCRIPT)
+                context.set_default_timeout(self.default_timeout) # increase from 30 sec to 60 secs for general timeout
+                entry = PooledContext(context)
+                self.contexts[key] = entry
+                if setup:
+                    entry.extra = await setup(context)
+                log_message(f"[Pool] New context for {key}")
+            entry.refcount += 1
+            entry.uses += 1
+            return entry.context
+
+    def is_live(self, key):
+        """True if acquire(key) would hand out an existing context."""
+        entry = self.contexts.get(key)
+        return entry is not None and not entry.retired
+
+    def extra(self, key):
+        entry = self.contexts.get(key)
+        return entry.extra if entry else None
+
+    async def release(self, key, context, recycle=False):
+        """
+        Give a context back. With `recycle`, or once it has been handed out
+        `max_context_uses` times, the context is retired and closed as soon
+        as nobody holds it anymore.
+        """
+        entry = self.contexts.get(key)
+        if entry is None or entry.context is not context:
+            # Already replaced (browser crash or retired), just close it
+            await self._close_context(context)
+            return
+        entry.refcount -= 1
+        if recycle or entry.uses >= self.max_context_uses:
+            entry.retired = True
+        if entry.retired and entry.refcount <= 0:
+            del self.contexts[key]
+            await self._close_context(context)
+
+    async def _close_context(self, context):
+        try:
+            await context.close()
+        except Exception as e:
+            log_message(f"[Pool] Error closing context: {e}")
+
+    async def close(self):
+        for entry in list(self.contexts.values()):
+            await self._close_context(entry.context)
+        self.contexts.clear()
+        if self.browser:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                log_message(f"[Pool] Error closing browser: {e}")
+            self.browser = None
@@ -23,6 +23,22 @@ command = [
     'meulade.py',
     'gui.py',
     'browser.py',
+    'engine.py',
+    'browser_pool.py',
+    'rvsq_flow.py',
+    'rvsq_http.py',
+    'resource_filter.py',
+    'classifier.py',
+    'jobs.py',
+    'pacing.py',
+    'circuit.py',
+    'metrics.py',
+    'artifacts.py',
+    'session_store.py',
+    'asset_cache.py',
+    'supervisor.py',
+    'page_watchdog.py',
+    'result_changes.py',
     'languages.py',
     'logger.py',
     '--onefile',
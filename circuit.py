@@ -0,0 +1,165 @@
+import asyncio
+import random
+import threading
+import time
+from logger import log_message
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# Kinds of push-back
+THROTTLE = 'throttle'
+CHALLENGE = 'challenge'
+ERROR = 'error'
+
+# Looks for a Cloudflare challenge or a throttling page in one round trip
+BLOCK_DETECTION_SCRIPT = """
+() => {
+    const title = (document.title || '').toLowerCase();
+    const text = document.body ? document.body.innerText.slice(0, 5000).toLowerCase() : '';
+    const challenge = !!document.querySelector('#challenge-form, #challenge-running, #cf-challenge-running, iframe[src*="challenges.cloudflare.com"]')
+        || title.includes('just a moment') || title.includes('un instant') || title.includes('attention required');
+    if (challenge) return 'challenge';
+    const throttled = ['too many requests', 'trop de requêtes', 'rate limit', 'error 1015', 'service unavailable']
+        .some(marker => title.includes(marker) || text.includes(marker));
+    return throttled ? 'throttle' : null;
+}
+"""
+
+THROTTLE_STATUSES = {429, 503}
+CHALLENGE_STATUSES = {403}
+
+def kind_from_status(status):
+    if status in THROTTLE_STATUSES:
+        return THROTTLE
+    if status in CHALLENGE_STATUSES:
+        return CHALLENGE
+    return None
+
+async def detect_block(page):
+    """Returns 'challenge', 'throttle' or None for the current page."""
+    try:
+        return await page.evaluate(BLOCK_DETECTION_SCRIPT)
+    except Exception:
+        return None
+
+
+# Called with (site, state) after each change of a breaker, see CircuitBreaker.state_dict()
+breaker_listeners = []
+
+class CircuitBreaker:
+    """
+    Per-site breaker. Consecutive failures back off exponentially; after
+    `failure_threshold` of them (or any challenge) the circuit opens and
+    every search of that site waits. When the open period ends one trial
+    poll is let through (half-open): success closes the circuit, failure
+    reopens it for twice as long.
+    """
+    def __init__(self, site, failure_threshold=3, base_delay=5, max_delay=600):
+        self.site = site
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = CLOSED
+        self.failures = 0
+        self.open_count = 0
+        self.opened_until = 0
+        self.last_kind = None
+        self.lock = threading.Lock()
+
+    def record_success(self):
+        with self.lock:
+            changed = self.failures or self.state != CLOSED
+            self.failures = 0
+            if self.state != CLOSED:
+                log_message(f"[Circuit] {self.site}: closed")
+            self.state = CLOSED
+            self.open_count = 0
+        if changed:
+            self._notify()
+
+    def record_failure(self, kind=ERROR):
+        """Returns the backoff delay in seconds before the next attempt."""
+        with self.lock:
+            self.failures += 1
+            self.last_kind = kind
+            if self.state == HALF_OPEN or kind == CHALLENGE or self.failures >= self.failure_threshold:
+                self._open()
+                delay = max(0, self.opened_until - time.time())
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1)) * random.uniform(0.8, 1.2)
+        self._notify()
+        return delay
+
+    def _open(self):
+        self.open_count += 1
+        duration = min(self.max_delay, self.base_delay * self.failure_threshold * 2 ** (self.open_count - 1))
+        self.state = OPEN
+        self.opened_until = time.time() + duration * random.uniform(0.9, 1.1)
+        log_message(f"[Circuit] {self.site}: open for {int(duration)}s ({self.last_kind})")
+
+    def wait_time(self):
+        """Seconds before the next request is allowed."""
+        with self.lock:
+            if self.state != OPEN:
+                return 0
+            remaining = self.opened_until - time.time()
+            if remaining > 0:
+                return remaining
+            self.state = HALF_OPEN
+            log_message(f"[Circuit] {self.site}: half-open, trying one request")
+        self._notify()
+        return 0
+
+    def state_dict(self):
+        """Everything needed to mirror this breaker in another process."""
+        with self.lock:
+            return {'state': self.state, 'failures': self.failures, 'open_count': self.open_count,
+                    'opened_until': self.opened_until, 'last_kind': self.last_kind}
+
+    def apply(self, state):
+        """Take over the state of the same breaker in another process (no listeners called)."""
+        with self.lock:
+            for name, value in state.items():
+                setattr(self, name, value)
+
+    def _notify(self):
+        if breaker_listeners:
+            state = self.state_dict()
+            for listener in breaker_listeners:
+                listener(self.site, state)
+
+    def describe(self):
+        with self.lock:
+            if self.state == OPEN:
+                return f"{self.state} ({max(0, int(self.opened_until - time.time()))}s)"
+            return self.state
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(site):
+    with _breakers_lock:
+        if site not in _breakers:
+            _breakers[site] = CircuitBreaker(site)
+        return _breakers[site]
+
+def states():
+    """{site: description} for every breaker created so far."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.site: breaker.describe() for breaker in breakers}
+
+async def pause(seconds, search_running):
+    """Sleep up to `seconds`, waking early if the search is stopped."""
+    deadline = time.time() + seconds
+    while search_running.get() and time.time() < deadline:
+        await asyncio.sleep(min(1, deadline - time.time()))
+
+async def wait_until_allowed(breaker, search_running):
+    remaining = breaker.wait_time()
+    while remaining > 0 and search_running.get():
+        await pause(min(remaining, 5), search_running)
+        remaining = breaker.wait_time()
@@ -0,0 +1,185 @@
+NO_SLOTS = 'no_slots'
+SLOTS = 'slots'
+ERROR = 'error'
+UNKNOWN = 'unknown'
+
+# Short prefixes: the live pages vary in apostrophes and non-breaking spaces
+NO_SLOTS_TEXTS = [
+    "Aucun rendez-vous rpondant",
+    "Aucun rendez-vous répondant à vos critères de recherche",
+]
+CLINIC_SECTION_TEXT = "Les cliniques suivantes offrent des disponibilités"
+ERROR_SELECTORS = ['.validation-summary-errors', '.alert-danger', '.error-message']
+
+# Gathers every indicator in a single round trip. innerText only contains
+# rendered text, so text markers inside hidden elements are ignored.
+INDICATORS_SCRIPT = """
+({noSlotsTexts, clinicSectionText, errorSelectors}) => {
+    const visible = el => {
+        const style = window.getComputedStyle(el);
+        const rect = el.getBoundingClientRect();
+        return style.display !== 'none' && style.visibility !== 'hidden' && rect.width > 0 && rect.height > 0;
+    };
+    const text = document.body ? document.body.innerText.replace(/\\s+/g, ' ') : '';
+    const noSlotsElement = document.querySelector('#clinicsWithNoDisponibilities');
+    return {
+        no_slots_element: !!noSlotsElement && visible(noSlotsElement),
+        no_slots_text: noSlotsTexts.some(marker => text.includes(marker)),
+        clinic_section: text.includes(clinicSectionText),
+        clinic_count: document.querySelectorAll('#ClinicList li').length,
+        error: errorSelectors.some(sel => Array.from(document.querySelectorAll(sel)).some(visible)),
+        title: document.title,
+    };
+}
+"""
+
+# Cheap hash of the regions the classification depends on: the title, then
+# for each selector its match count, visibility, tag structure and text,
+# then whether the body's textContent contains each marker. Only
+# textContent is read: innerText forces a layout of the page, the cost the
+# fingerprint is there to avoid. FNV-1a, 32 bits.
+FINGERPRINT_FUNCTION = """
+(selectors, markers) => {
+    let hash = 0x811c9dc5;
+    const add = value => {
+        for (let i = 0; i < value.length; i++) {
+            hash ^= value.charCodeAt(i);
+            hash = Math.imul(hash, 0x01000193);
+        }
+    };
+    add(document.title);
+    for (const sel of selectors) {
+        const els = document.querySelectorAll(sel);
+        add('|' + sel + ':' + els.length);
+        els.forEach(el => {
+            add(el.getClientRects().length ? '+' : '-');
+            add(Array.from(el.querySelectorAll('*'), child => child.tagName).join(','));
+            add((el.textContent || '').replace(/\\s+/g, ' ').trim());
+        });
+    }
+    if (markers.length) {
+        const text = document.body ? document.body.textContent : '';
+        add('|' + markers.map(marker => text.includes(marker) ? '1' : '0').join(''));
+    }
+    return (hash >>> 0).toString(16);
+}
+"""
+
+def changed_only(indicators_script):
+    """
+    Wrap an indicators script so the page first fingerprints the result
+    regions and body text markers, and only gathers the indicators if the
+    fingerprint differs from the previous one.
+    """
+    return f"""
+({{previous, regions, markers, args}}) => {{
+    const fingerprint = ({FINGERPRINT_FUNCTION})(regions, markers);
+    if (previous && fingerprint === previous) return {{fingerprint, indicators: null}};
+    return {{fingerprint, indicators: ({indicators_script})(args)}};
+}}
+"""
+
+class SearchResult:
+    """Classification of a result page (RVSQ or Bonjour Santé)."""
+    def __init__(self, status, clinic_count=0, detail=''):
+        self.status = status
+        self.clinic_count = clinic_count
+        self.detail = detail
+
+    def __eq__(self, other):
+        return isinstance(other, SearchResult) and (self.status, self.clinic_count) == (other.status, other.clinic_count)
+
+    def __repr__(self):
+        return f"SearchResult({self.status!r}, clinic_count={self.clinic_count}, detail={self.detail!r})"
+
+
+def classify_indicators(indicators):
+    """Decide the page status from the indicators gathered in the page."""
+    if indicators['no_slots_element'] or indicators['no_slots_text']:
+        return SearchResult(NO_SLOTS)
+    if indicators['clinic_section']:
+        if indicators['clinic_count'] > 0:
+            return SearchResult(SLOTS, indicators['clinic_count'])
+        return SearchResult(UNKNOWN, detail='Clinic section visible but no clinics found (False Positive)')
+    if indicators['error']:
+        return SearchResult(ERROR, detail=indicators.get('title', ''))
+    return SearchResult(UNKNOWN, detail='No known result indicator on the page')
+
+async def gather_indicators(page):
+    return await page.evaluate(INDICATORS_SCRIPT, {
+        'noSlotsTexts': NO_SLOTS_TEXTS,
+        'clinicSectionText': CLINIC_SECTION_TEXT,
+        'errorSelectors': ERROR_SELECTORS,
+    })
+
+async def classify_rvsq(page):
+    """Classify the current RVSQ result page in one browser round trip."""
+    return classify_indicators(await gather_indicators(page))
+
+RVSQ_RESULT_REGIONS = ['#ClinicList', '#clinicsWithNoDisponibilities'] + ERROR_SELECTORS
+# No body markers: INDICATORS_SCRIPT looks for them in the rendered text,
+# which only a layout can tell. Changes outside the regions are caught by
+# the periodic full classification (result_changes.FULL_CHECK_EVERY).
+RVSQ_BODY_MARKERS = []
+RVSQ_CHECK_SCRIPT = changed_only(INDICATORS_SCRIPT)
+
+async def check_rvsq(page, previous=None):
+    """
+    Fingerprint the RVSQ results and classify them only if the fingerprint
+    is not `previous`. Returns (fingerprint, SearchResult or None if unchanged).
+    """
+    check = await page.evaluate(RVSQ_CHECK_SCRIPT, {
+        'previous': previous,
+        'regions': RVSQ_RESULT_REGIONS,
+        'markers': RVSQ_BODY_MARKERS,
+        'args': {
+            'noSlotsTexts': NO_SLOTS_TEXTS,
+            'clinicSectionText': CLINIC_SECTION_TEXT,
+            'errorSelectors': ERROR_SELECTORS,
+        },
+    })
+    indicators = check['indicators']
+    return check['fingerprint'], classify_indicators(indicators) if indicators else None
+
+
+BONJOUR_NO_SLOTS_TEXT = 'Aucun rendez-vous ne correspond à vos critères de recherche'
+BONJOUR_RESERVED_TEXT = 'Consultation réservée pour vous'
+
+# Runs inside the hub iframe; returns a compact status instead of the
+# serialized document
+BONJOUR_INDICATORS_SCRIPT = """
+(reservedText) => {
+    const message = document.querySelector('span.label-message');
+    return {
+        locked: document.querySelectorAll('app-locked-walkin-availability[data-test="locked-walkin-availability"]').length > 0,
+        reserved: document.body ? document.body.textContent.includes(reservedText) : false,
+        alert: !!document.querySelector('div.t-alert-content'),
+        message: message ? message.innerText : '',
+    };
+}
+"""
+
+def classify_bonjour_indicators(indicators):
+    if indicators['locked'] or indicators['reserved']:
+        return SearchResult(SLOTS, 1)
+    if indicators['alert']:
+        return SearchResult(ERROR, detail='Une erreur est survenue lors de la recherche de consultations.')
+    if BONJOUR_NO_SLOTS_TEXT in indicators['message']:
+        return SearchResult(NO_SLOTS)
+    return SearchResult(UNKNOWN, detail=indicators['message'])
+
+BONJOUR_RESULT_REGIONS = ['app-locked-walkin-availability', 'span.label-message', 'div.t-alert-content', 'lib-alert']
+# The reserved marker is read from textContent, as BONJOUR_INDICATORS_SCRIPT does
+BONJOUR_BODY_MARKERS = [BONJOUR_RESERVED_TEXT]
+BONJOUR_CHECK_SCRIPT = changed_only(BONJOUR_INDICATORS_SCRIPT)
+
+async def check_bonjoursante(frame, previous=None):
+    """Hub iframe counterpart of check_rvsq."""
+    check = await frame.evaluate(BONJOUR_CHECK_SCRIPT, {
+        'previous': previous,
+        'regions': BONJOUR_RESULT_REGIONS,
+        'markers': BONJOUR_BODY_MARKERS,
+        'args': BONJOUR_RESERVED_TEXT,
+    })
+    indicators = check['indicators']
+    return check['fingerprint'], classify_bonjour_indicators(indicators) if indicators else None
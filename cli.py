@@ -0,0 +1,148 @@
+"""
+Headless entry point: runs the saved searches without Tk.
+
+Reads the encrypted config saved by the GUI (config.json + secret.key in the
+working directory), runs the selected sites and streams the log to stdout
+or a file. SIGTERM / SIGINT stop the searches and close the browser cleanly;
+a second signal exits immediately.
+
+    python cli.py                          # sites enabled in the saved config
+    python cli.py --sites rvsq --headless
+    python cli.py --daemon --log-file /var/log/meulade.log --pid-file /run/meulade.pid
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+import logger
+from logger import log_message
+import security
+import jobs
+from jobs import SharedBoolean
+
+SITES = ['rvsq', 'bonjoursante']
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', help='comma-separated sites to search (rvsq, bonjoursante); defaults to the saved selection')
+    parser.add_argument('--headless', action='store_true', help="shortcut for --profile headless")
+    parser.add_argument('--profile', choices=['visible', 'headless', 'lean'], help='browser launch profile (default: saved setting)')
+    parser.add_argument('--no-autobook', action='store_true', help='only report slots, do not book them (overrides the saved RVSQ setting)')
+    parser.add_argument('--max-concurrency', type=int, help='searches running at the same time')
+    parser.add_argument('--processes', action='store_true', help='run each search in its own worker process')
+    parser.add_argument('--log-file', help='write the log to this rotating file')
+    parser.add_argument('--quiet', action='store_true', help='do not print the log to stdout')
+    parser.add_argument('--debug', action='store_true', help='include [DEBUG] lines on stdout')
+    parser.add_argument('--metrics-port', type=int, help='serve metrics on this local port')
+    parser.add_argument('--daemon', action='store_true', help='service mode: log to a file (meulade.log by default) instead of stdout')
+    parser.add_argument('--pid-file', help='write the process id to this file while running')
+    return parser.parse_args(argv)
+
+def selected_sites(args, personal_info):
+    if args.sites:
+        sites = [site.strip() for site in args.sites.split(',') if site.strip()]
+        unknown = [site for site in sites if site not in SITES]
+        if unknown:
+            raise SystemExit(f"Unknown site(s): {', '.join(unknown)}")
+        return sites
+    # Same order and defaults as the GUI
+    sites = []
+    if personal_info.get('bonjour_enabled', False):
+        sites.append('bonjoursante')
+    if personal_info.get('rvsq_enabled', True):
+        sites.append('rvsq')
+    return sites
+
+def install_signal_handlers(search_running):
+    def handle(signum, frame):
+        if not search_running.get():
+            log_message("[CLI] Second signal, exiting now")
+            os._exit(1)
+        log_message(f"[CLI] Received {signal.Signals(signum).name}, stopping searches...")
+        search_running.set(False)
+    signal.signal(signal.SIGINT, handle)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, handle)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.daemon and not args.log_file:
+        args.log_file = 'meulade.log'
+    if args.log_file:
+        logger.enable_file_log(args.log_file)
+    if not args.quiet and not args.daemon:
+        logger.enable_stream_log(sys.stdout, logger.DEBUG if args.debug else logger.INFO)
+
+    config = security.load_encrypted_config()
+    if not config.get('personal_info'):
+        log_message("[CLI] No saved configuration found; save one from the GUI first")
+        return 2
+    personal_info = config['personal_info']
+    if args.headless:
+        personal_info['launch_profile'] = 'headless'
+    if args.profile:
+        personal_info['launch_profile'] = args.profile
+    if args.max_concurrency:
+        personal_info['max_concurrency'] = args.max_concurrency
+
+    sites = selected_sites(args, personal_info)
+    if not sites:
+        log_message("[CLI] No site selected")
+        return 2
+
+    from browser_pool import chromium_installed
+    if not chromium_installed(personal_info.get('launch_profile')):
+        log_message("[CLI] Chromium not found, run 'playwright install chromium' first")
+        return 2
+
+    if args.pid_file:
+        with open(args.pid_file, 'w') as f:
+            f.write(str(os.getpid()))
+
+    # Browser modules pull in Playwright; import them once the config is known good
+    import browser
+    from engine import get_engine
+    import metrics
+    import artifacts
+
+    metrics_port = args.metrics_port or (personal_info.get('metrics_port', 9464) if personal_info.get('metrics_enabled') else None)
+    if metrics_port:
+        metrics.start_exporter(metrics_port)
+
+    search_running = SharedBoolean(True)
+    install_signal_handlers(search_running)
+    log_message(f"[CLI] Searching {', '.join(sites)} (profile: {personal_info.get('launch_profile', 'visible')})")
+    autobook = {'bonjoursante': not args.no_autobook,
+                'rvsq': personal_info.get('rvsq_autobook', False) and not args.no_autobook}
+    if args.processes or personal_info.get('worker_processes', False):
+        import supervisor
+        future = supervisor.submit_jobs(config, sites, search_running, autobook)
+    else:
+        future = browser.submit_jobs(config, sites, search_running, autobook)
+
+    exit_code = 0
+    try:
+        # Short waits keep the main thread responsive to signals
+        while not future.done():
+            time.sleep(0.5)
+        statuses = future.result()
+        if any(status == jobs.FAILED for status in statuses.values()):
+            exit_code = 1
+    except Exception as e:
+        log_message(f"[CLI] Search stopped with an error: {e}")
+        exit_code = 1
+    finally:
+        search_running.set(False)
+        get_engine().shutdown()
+        artifacts.flush_all()
+        metrics.stop_exporter()
+        log_message("[CLI] Stopped")
+        logger.disable_file_log()
+        if args.pid_file and os.path.exists(args.pid_file):
+            os.remove(args.pid_file)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from playwright.async_api import async_playwright
+from logger import log_message
+from browser_pool import BrowserPool, DEFAULT_PROFILE, get_launch_profile
+
+class SearchEngine:
+    """
+    Runs every site flow as a coroutine on a single asyncio event loop.
+
+    The loop lives on one background thread so the Tk main loop is never
+    blocked, and all flows share one Playwright driver.
+    """
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.playwright = None
+        self.pools = {}
+        self._lock = threading.Lock()
+        self._playwright_lock = None
+
+    def start(self):
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self._run_loop, name="search-engine", daemon=True)
+            self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def get_playwright(self):
+        """Start the shared Playwright driver on first use."""
+        if self._playwright_lock is None:
+            self._playwright_lock = asyncio.Lock()
+        async with self._playwright_lock:
+            if self.playwright is None:
+                log_message("[Engine] Starting Playwright driver...")
+                self.playwright = await async_playwright().start()
+        return self.playwright
+
+    async def get_pool(self, profile=None):
+        """
+        Shared browser pool, one Chromium process for every search using
+        the same launch profile.
+        """
+        profile = profile or DEFAULT_PROFILE
+        playwright = await self.get_playwright()
+        if profile not in self.pools:
+            settings = get_launch_profile(profile)
+            self.pools[profile] = BrowserPool(playwright, settings['launch'], settings['context'])
+        return self.pools[profile]
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the engine loop from any thread.
+        Returns a concurrent.futures.Future.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """Blocking helper: submit a coroutine and wait for its result."""
+        return self.submit(coro).result()
+
+    async def _close(self):
+        for pool in self.pools.values():
+            await pool.close()
+        self.pools.clear()
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    def shutdown(self):
+        with self._lock:
+            if not self.loop or not self.thread or not self.thread.is_alive():
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._close(), self.loop).result(timeout=10)
+            except Exception as e:
+                log_message(f"[Engine] Error stopping Playwright: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+            self.thread = None
+
+
+default_engine = SearchEngine()
+
+def get_engine():
+    return default_engine
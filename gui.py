@@ -1,27 +1,46 @@
 import customtkinter as ctk
-import threading
 import webbrowser
 from languages import translations, languages
-import browser
+import circuit
+import metrics
 import sys
 import os
-import shutil
-from logger import default_message_queue, log_message
-import security
+import threading
+import logger
+from logger import default_log, log_message
+from jobs import SharedBoolean
 from PIL import Image
 
-class SharedBoolean:
-    def __init__(self, initial_value):
-        self.value = initial_value
-        self.lock = threading.Lock()
+# Lines kept in the log box; older ones are dropped from the top
+LOG_SCROLLBACK = 1000
+
+# The log box is only redrawn when records arrived since the last check;
+# the circuit label and the buttons are refreshed on a slower timer
+LOG_CHECK_MS = 200
+STATUS_REFRESH_MS = 1000
 
-    def set(self, new_value):
-        with self.lock:
-            self.value = new_value
+# On close, time given to in-process flows to close their pages before the
+# engine and Chromium are shut down under them
+ENGINE_STOP_TIMEOUT = 15
+
+class LogSignal:
+    """
+    Log sink that only raises a flag. Logging threads (engine loop,
+    supervisor) must not call into Tk: _tkinter would block them until the
+    Tk thread runs the call.
+    """
+    def __init__(self):
+        self.event = threading.Event()
 
-    def get(self):
-        with self.lock:
-            return self.value
+    def put(self, record):
+        self.event.set()
+
+    def take(self):
+        """True if records arrived since the last call."""
+        if not self.event.is_set():
+            return False
+        self.event.clear()
+        return True
 
 class AppGUI(ctk.CTk):
     def __init__(self):
@@ -46,7 +65,9 @@ class AppGUI(ctk.CTk):
         
         # State
         self.search_running = SharedBoolean(False)
+        self.search_future = None
         self.autobook = True
+        self.metrics_port = 9464
         
         # Load logo
         self.logo = None
@@ -65,9 +86,16 @@ class AppGUI(ctk.CTk):
             print(f"Warning: Could not load logo image: {str(e)}")
 
         self.setup_ui()
-        self.load_saved_config()
+        # Decrypting the config pulls in cryptography: do it once the window is up
+        self.after(50, self.load_saved_config)
         
-        # Start status update loop
+        # Log box follows the message log; status update loop for the rest
+        self.last_log_seq = 0
+        self.log_lines = 0
+        self.log_signal = LogSignal()
+        default_log.add_sink(self.log_signal)
+        self.show_new_records()
+        self.check_log()
         self.update_status()
 
     def setup_ui(self):
@@ -216,6 +244,92 @@ class AppGUI(ctk.CTk):
         self.bonjour_checkbox = ctk.CTkCheckBox(self.website_frame, text="Bonjour Santé", variable=self.bonjour_var)
         self.bonjour_checkbox.grid(row=0, column=1, padx=10)
 
+        # RVSQ polls replay the search request over HTTP instead of re-rendering the page
+        self.http_poll_var = ctk.BooleanVar(value=False)
+        self.http_poll_checkbox = ctk.CTkCheckBox(self.website_frame, text="HTTP polling (RVSQ)", variable=self.http_poll_var)
+        self.http_poll_checkbox.grid(row=1, column=0, padx=10, pady=(5, 0), sticky="w")
+
+        self.block_resources_var = ctk.BooleanVar(value=True)
+        self.block_resources_checkbox = ctk.CTkCheckBox(self.website_frame, text="Block images & trackers", variable=self.block_resources_var)
+        self.block_resources_checkbox.grid(row=1, column=1, padx=10, pady=(5, 0), sticky="w")
+
+        # Launch profile: visible window, headless, or headless with low-memory flags
+        self.launch_profile_label = ctk.CTkLabel(self.website_frame, text="Browser mode", anchor="w")
+        self.launch_profile_label.grid(row=2, column=0, padx=10, pady=(5, 0), sticky="w")
+        self.launch_profile_var = ctk.StringVar(value="visible")
+        self.launch_profile_menu = ctk.CTkOptionMenu(self.website_frame,
+                                                     values=["visible", "headless", "lean"],
+                                                     variable=self.launch_profile_var,
+                                                     width=120)
+        self.launch_profile_menu.grid(row=2, column=1, padx=10, pady=(5, 0), sticky="w")
+
+        # Poll pacing: fixed random jitter, or adaptive to when slots usually appear
+        self.pacing_label = ctk.CTkLabel(self.website_frame, text="Polling pace", anchor="w")
+        self.pacing_label.grid(row=3, column=0, padx=10, pady=(5, 0), sticky="w")
+        self.pacing_var = ctk.StringVar(value="fixed")
+        self.pacing_menu = ctk.CTkOptionMenu(self.website_frame,
+                                             values=["fixed", "adaptive"],
+                                             variable=self.pacing_var,
+                                             width=120)
+        self.pacing_menu.grid(row=3, column=1, padx=10, pady=(5, 0), sticky="w")
+
+        # Full history for unattended runs, written to a rotating file
+        self.log_file_var = ctk.BooleanVar(value=False)
+        self.log_file_checkbox = ctk.CTkCheckBox(self.website_frame, text="Write log file", variable=self.log_file_var)
+        self.log_file_checkbox.grid(row=4, column=0, padx=10, pady=(5, 0), sticky="w")
+
+        # Timing and counters on http://127.0.0.1:<port>/metrics, plus metrics.json
+        self.metrics_var = ctk.BooleanVar(value=False)
+        self.metrics_checkbox = ctk.CTkCheckBox(self.website_frame, text="Metrics endpoint", variable=self.metrics_var)
+        self.metrics_checkbox.grid(row=4, column=1, padx=10, pady=(5, 0), sticky="w")
+
+        # Click the first RVSQ slot before saving the screenshot and page
+        self.rvsq_autobook_var = ctk.BooleanVar(value=False)
+        self.rvsq_autobook_checkbox = ctk.CTkCheckBox(self.website_frame, text="Book RVSQ slot first", variable=self.rvsq_autobook_var)
+        self.rvsq_autobook_checkbox.grid(row=5, column=0, padx=10, pady=(5, 0), sticky="w")
+
+        # Keep Cloudflare clearance and consent cookies between runs, encrypted on disk
+        self.reuse_sessions_var = ctk.BooleanVar(value=True)
+        self.reuse_sessions_checkbox = ctk.CTkCheckBox(self.website_frame, text="Reuse site sessions", variable=self.reuse_sessions_var)
+        self.reuse_sessions_checkbox.grid(row=5, column=1, padx=10, pady=(5, 0), sticky="w")
+
+        current_row += 1
+
+        # Fan-out: more postal codes and family profiles, searched in parallel
+        self.jobs_frame = ctk.CTkFrame(self.input_frame, fg_color="transparent")
+        self.jobs_frame.grid(row=current_row, column=0, sticky="ew", pady=(5, 5))
+        self.jobs_frame.grid_columnconfigure(0, weight=1)
+
+        self.extra_postal_label = ctk.CTkLabel(self.jobs_frame, text="Extra postal codes (comma separated)", anchor="w")
+        self.extra_postal_label.grid(row=0, column=0, columnspan=2, sticky="w")
+        self.extra_postal_entry = ctk.CTkEntry(self.jobs_frame, placeholder_text="A0A 0A0, B1B 1B1")
+        self.extra_postal_entry.grid(row=1, column=0, sticky="ew", pady=(0, 5))
+
+        self.max_concurrency_var = ctk.StringVar(value="4")
+        self.max_concurrency_menu = ctk.CTkOptionMenu(self.jobs_frame,
+                                                      values=[str(n) for n in range(1, 9)],
+                                                      variable=self.max_concurrency_var,
+                                                      width=60)
+        self.max_concurrency_menu.grid(row=1, column=1, padx=(10, 0), pady=(0, 5))
+
+        self.extra_profiles = []
+        self.profiles_label = ctk.CTkLabel(self.jobs_frame, text="", anchor="w")
+        self.profiles_label.grid(row=2, column=0, sticky="w")
+        self.profile_buttons_frame = ctk.CTkFrame(self.jobs_frame, fg_color="transparent")
+        self.profile_buttons_frame.grid(row=3, column=0, columnspan=2, sticky="w")
+        self.add_profile_button = ctk.CTkButton(self.profile_buttons_frame, text="Add as family profile",
+                                                command=self.add_profile, width=150)
+        self.add_profile_button.grid(row=0, column=0, padx=(0, 10))
+        self.clear_profiles_button = ctk.CTkButton(self.profile_buttons_frame, text="Clear family profiles",
+                                                   command=self.clear_profiles, width=150, fg_color="gray")
+        self.clear_profiles_button.grid(row=0, column=1)
+        self.update_profiles_label()
+
+        # Each search in its own process: a hung or crashed browser only takes down its worker
+        self.worker_processes_var = ctk.BooleanVar(value=False)
+        self.worker_processes_checkbox = ctk.CTkCheckBox(self.jobs_frame, text="Separate process per search", variable=self.worker_processes_var)
+        self.worker_processes_checkbox.grid(row=4, column=0, columnspan=2, pady=(5, 0), sticky="w")
+
         current_row += 1
 
         # Buttons
@@ -237,6 +351,10 @@ class AppGUI(ctk.CTk):
                                        state="disabled")
         self.stop_button.grid(row=0, column=1, padx=10)
 
+        # Circuit breaker state per site
+        self.circuit_label = ctk.CTkLabel(self.button_frame, text="")
+        self.circuit_label.grid(row=1, column=0, columnspan=2, pady=(10, 0))
+
         # Log Area
         self.log_textbox = ctk.CTkTextbox(self.main_frame, height=150)
         self.log_textbox.grid(row=3, column=0, sticky="ew", padx=20, pady=10)
@@ -256,6 +374,26 @@ class AppGUI(ctk.CTk):
         else:
             self.custom_reason_entry.grid_remove()
 
+    def update_profiles_label(self):
+        names = ", ".join(profile['name'] for profile in self.extra_profiles)
+        self.profiles_label.configure(text=f"Family profiles: {names or '-'}")
+
+    def add_profile(self):
+        # Snapshot the current form as an extra profile searched alongside the main one
+        personal_info = {}
+        for key, field in self.fields.items():
+            personal_info[key] = field['entry'].get()
+        if not personal_info.get('first_name'):
+            log_message("Error: first_name is required")
+            return
+        self.extra_profiles.append({'name': personal_info['first_name'], 'personal_info': personal_info})
+        self.update_profiles_label()
+        log_message(f"Profile added: {personal_info['first_name']}")
+
+    def clear_profiles(self):
+        self.extra_profiles = []
+        self.update_profiles_label()
+
     def get_text(self, key):
         return self.translations.get(self.current_language, self.translations['English']).get(key, key)
 
@@ -278,6 +416,7 @@ class AppGUI(ctk.CTk):
         # Update birth date labels if I added them to translations
         
     def load_saved_config(self):
+        import security
         config = security.load_encrypted_config()
         if not config:
             return
@@ -305,6 +444,21 @@ class AppGUI(ctk.CTk):
         # Load selected websites (Default RVSQ=True, Bonjour=False if not found)
         self.rvsq_var.set(personal_info.get('rvsq_enabled', True))
         self.bonjour_var.set(personal_info.get('bonjour_enabled', False))
+        self.http_poll_var.set(personal_info.get('poll_mode', 'browser') == 'http')
+        self.block_resources_var.set(personal_info.get('block_resources', True))
+        self.launch_profile_var.set(personal_info.get('launch_profile', 'visible'))
+        self.pacing_var.set(personal_info.get('pacing', 'fixed'))
+        self.log_file_var.set(personal_info.get('log_to_file', False))
+        self.metrics_var.set(personal_info.get('metrics_enabled', False))
+        self.rvsq_autobook_var.set(personal_info.get('rvsq_autobook', False))
+        self.reuse_sessions_var.set(personal_info.get('reuse_sessions', True))
+        self.worker_processes_var.set(personal_info.get('worker_processes', False))
+        self.metrics_port = personal_info.get('metrics_port', 9464)
+        self.extra_postal_entry.delete(0, 'end')
+        self.extra_postal_entry.insert(0, personal_info.get('extra_postal_codes', ''))
+        self.max_concurrency_var.set(str(personal_info.get('max_concurrency', 4)))
+        self.extra_profiles = config.get('profiles', [])
+        self.update_profiles_label()
 
     def save_config(self):
         personal_info = {}
@@ -323,8 +477,21 @@ class AppGUI(ctk.CTk):
         # Save website selection
         personal_info['rvsq_enabled'] = self.rvsq_var.get()
         personal_info['bonjour_enabled'] = self.bonjour_var.get()
-
-        config = {"personal_info": personal_info}
+        personal_info['poll_mode'] = 'http' if self.http_poll_var.get() else 'browser'
+        personal_info['block_resources'] = self.block_resources_var.get()
+        personal_info['launch_profile'] = self.launch_profile_var.get()
+        personal_info['pacing'] = self.pacing_var.get()
+        personal_info['log_to_file'] = self.log_file_var.get()
+        personal_info['metrics_enabled'] = self.metrics_var.get()
+        personal_info['metrics_port'] = self.metrics_port
+        personal_info['rvsq_autobook'] = self.rvsq_autobook_var.get()
+        personal_info['reuse_sessions'] = self.reuse_sessions_var.get()
+        personal_info['worker_processes'] = self.worker_processes_var.get()
+        personal_info['extra_postal_codes'] = self.extra_postal_entry.get()
+        personal_info['max_concurrency'] = int(self.max_concurrency_var.get())
+
+        config = {"personal_info": personal_info, "profiles": self.extra_profiles}
+        import security
         security.save_encrypted_config(config)
         return config
 
@@ -337,25 +504,46 @@ class AppGUI(ctk.CTk):
                 return
 
         config = self.save_config()
-        self.search_running.set(True)
+        if config['personal_info']['log_to_file']:
+            logger.enable_file_log()
+        else:
+            logger.disable_file_log()
+        if config['personal_info']['metrics_enabled']:
+            metrics.start_exporter(config['personal_info']['metrics_port'])
+        if not config['personal_info']['reuse_sessions']:
+            import session_store
+            session_store.clear()
+        # A fresh flag per run: flows of a stopped run still winding down keep
+        # seeing theirs false, and their end cannot stop this run
+        search_running = self.search_running = SharedBoolean(True)
 
         self.start_button.configure(state="disabled", fg_color="gray")
         self.stop_button.configure(state="normal", fg_color=self.RED)
 
-        # Start threads based on selection
+        # Schedule every (profile, postal code, site) job on the shared engine loop
+        sites = []
         if self.bonjour_var.get():
-            self.search_thread_1 = threading.Thread(target=self.run_search_wrapper, args=('bonjoursante', config, self.search_running, self.autobook))
-            self.search_thread_1.daemon = True
-            self.search_thread_1.start()
-
+            sites.append('bonjoursante')
         if self.rvsq_var.get():
-            self.search_thread_2 = threading.Thread(target=self.run_search_wrapper, args=('rvsq', config, self.search_running, False))
-            self.search_thread_2.daemon = True
-            self.search_thread_2.start()
+            sites.append('rvsq')
 
-        if not self.rvsq_var.get() and not self.bonjour_var.get():
+        if not sites:
             log_message("Please select at least one website")
             self.stop_search()
+            return
+
+        autobook = {'bonjoursante': self.autobook, 'rvsq': self.rvsq_autobook_var.get()}
+        if config['personal_info']['worker_processes']:
+            import supervisor
+            future = supervisor.submit_jobs(config, sites, search_running, autobook)
+            self.stop_timeout = supervisor.STOP_TIMEOUT + 10
+        else:
+            # Playwright is only loaded once a search starts
+            import browser
+            future = browser.submit_jobs(config, sites, search_running, autobook)
+            self.stop_timeout = ENGINE_STOP_TIMEOUT
+        self.search_future = future
+        future.add_done_callback(lambda f: self.on_search_done(sites, f, search_running))
 
     def stop_search(self):
         self.search_running.set(False)
@@ -363,48 +551,69 @@ class AppGUI(ctk.CTk):
         self.stop_button.configure(state="disabled", fg_color="gray")
         log_message("Stopping search...")
 
-    def run_search_wrapper(self, website, config, search_running, autobook):
+    def on_search_done(self, sites, future, search_running):
+        # Runs on the engine thread: no Tk calls here
         try:
-            if website == 'rvsq':
-                browser.run_automation_rvsq(config, search_running)
-            elif website == 'bonjoursante':
-                browser.run_automation_bonjoursante(config, search_running, autobook)
+            future.result()
         except Exception as e:
-            log_message(f"Error in {website}: {str(e)}")
+            log_message(f"Error in {', '.join(sites)}: {str(e)}")
         finally:
-            # Clean up browser data after browser closes
-            try:
-                data_path = os.path.join(os.getcwd(), 'browser_data', website)
-                if os.path.exists(data_path):
-                    shutil.rmtree(data_path)
-                    log_message(f"Browser data cleared for {website}.")
-            except Exception as e:
-                log_message(f"Error clearing data for {website}: {e}")
-
-            if not search_running.get():
-                # If we stopped, update UI in main thread if needed
-                pass
+            # Every job of that run has finished: let update_status reset the buttons
+            search_running.set(False)
 
-    def update_status(self):
-        # Update log
-        self.log_textbox.configure(state="normal")
-        current_text = self.log_textbox.get("1.0", "end")
+    def check_log(self):
+        if self.log_signal.take():
+            self.show_new_records()
+        self.after(LOG_CHECK_MS, self.check_log)
 
-        # Check if there are new messages
-        # efficient way?
-        # Just clear and rewrite for now or append new ones
-        self.log_textbox.delete("1.0", "end")
-        for msg in default_message_queue[-10:]:
-            self.log_textbox.insert("end", msg + "\n")
+    def show_new_records(self):
+        # Append only the records logged since the last refresh
+        records = default_log.since(self.last_log_seq)
+        if records:
+            self.last_log_seq = records[-1].seq
+            self.append_log(records)
 
-        self.log_textbox.see("end")
-        self.log_textbox.configure(state="disabled")
+    def update_status(self):
+        breaker_states = circuit.states()
+        circuit_text = " | ".join(f"{site}: {state}" for site, state in breaker_states.items())
+        if breaker_states and self.circuit_label.cget("text") != "Circuit " + circuit_text:
+            self.circuit_label.configure(text="Circuit " + circuit_text)
 
         # Check running state to update buttons if stopped from thread
         if not self.search_running.get() and self.stop_button._state == "normal":
              self.stop_search()
 
-        self.after(500, self.update_status)
+        self.after(STATUS_REFRESH_MS, self.update_status)
+
+    def append_log(self, records):
+        # Follow new lines only if the user has not scrolled up
+        at_bottom = self.log_textbox.yview()[1] >= 0.999
+        self.log_textbox.configure(state="normal")
+        text = "".join(record.text + "\n" for record in records)
+        self.log_textbox.insert("end", text)
+        self.log_lines += text.count("\n")
+        if self.log_lines > LOG_SCROLLBACK:
+            self.log_textbox.delete("1.0", f"{self.log_lines - LOG_SCROLLBACK + 1}.0")
+            self.log_lines = LOG_SCROLLBACK
+        if at_bottom:
+            self.log_textbox.see("end")
+        self.log_textbox.configure(state="disabled")
 
     def run(self):
         self.mainloop()
+        default_log.remove_sink(self.log_signal)
+        # Flows (or worker processes) wind down before the engine is shut down,
+        # so they do not try to recover from Chromium closing under them
+        if self.search_future and not self.search_future.done():
+            self.search_running.set(False)
+            try:
+                self.search_future.result(timeout=self.stop_timeout)
+            except Exception:
+                pass
+        # Nothing to stop if no search was ever started
+        if 'engine' in sys.modules:
+            sys.modules['engine'].get_engine().shutdown()
+        # Let queued screenshots reach the disk before the process exits
+        if 'artifacts' in sys.modules:
+            sys.modules['artifacts'].flush_all()
+        metrics.stop_exporter()
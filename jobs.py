@@ -0,0 +1,186 @@
+import asyncio
+import threading
+import time
+from logger import log_message
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+STOPPED = 'stopped'
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+# With more jobs than slots, each running job hands its slot to the next
+# waiting one after this long, so every search gets its turn
+DEFAULT_SLICE_SECONDS = 300
+
+class SharedBoolean:
+    def __init__(self, initial_value):
+        self.value = initial_value
+        self.lock = threading.Lock()
+
+    def set(self, new_value):
+        with self.lock:
+            self.value = new_value
+
+    def get(self):
+        with self.lock:
+            return self.value
+
+
+class JobRunning:
+    """
+    Per-job run flag layered over the profile and global ones. set(False)
+    (a booking) stops every job of the same person through
+    `profile_running`, so no second appointment is booked for them, while
+    the other profiles keep searching. With `slice_seconds` it also turns
+    false once the job's turn is over (`expired`), so the flow winds down
+    and the scheduler can run the next waiting job.
+    """
+    def __init__(self, global_running, slice_seconds=None, profile_running=None):
+        self.global_running = global_running
+        self.profile_running = profile_running or SharedBoolean(True)
+        self.value = True
+        self.lock = threading.Lock()
+        self.deadline = time.monotonic() + slice_seconds if slice_seconds else None
+        self.expired = False
+
+    def set(self, new_value):
+        with self.lock:
+            self.value = new_value
+        if not new_value:
+            self.profile_running.set(False)
+
+    def get(self):
+        with self.lock:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self.expired = True
+            value = self.value and not self.expired
+        return value and self.profile_running.get() and self.global_running.get()
+
+    def defer_rotation(self, seconds):
+        """Keep the slot for at least `seconds` more (a slot is on screen)."""
+        with self.lock:
+            if self.deadline is not None and not self.expired:
+                self.deadline = max(self.deadline, time.monotonic() + seconds)
+
+    @property
+    def rotated(self):
+        """The job gave up its slot at the end of its turn, not because it finished."""
+        with self.lock:
+            rotated = self.expired and self.value
+        return rotated and self.profile_running.get()
+
+
+class SearchJob:
+    """One (profile, postal code, site) search."""
+    def __init__(self, site, profile_name, personal_info, postal_code, autobook=False):
+        self.site = site
+        self.profile_name = profile_name
+        self.personal_info = dict(personal_info, postal_code=postal_code)
+        self.postal_code = postal_code
+        self.autobook = autobook
+        self.status = PENDING
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def name(self):
+        return f"{self.site}:{self.profile_name}:{self.postal_code}"
+
+    def config(self, base_config):
+        return dict(base_config, personal_info=self.personal_info)
+
+
+def split_postal_codes(value):
+    return [code.strip().upper() for code in value.replace(';', ',').split(',') if code.strip()]
+
+def build_jobs(config, sites, autobook=None):
+    """
+    Expand a saved config into jobs: every profile (the main one plus
+    config['profiles']) times every postal code times every site.
+    `autobook` maps a site to its autobook setting.
+    """
+    autobook = autobook or {}
+    personal_info = config['personal_info']
+    profiles = [('main', personal_info)]
+    for index, profile in enumerate(config.get('profiles', [])):
+        profiles.append((profile.get('name') or f"profile{index + 2}", dict(personal_info, **profile['personal_info'])))
+
+    jobs = []
+    for profile_name, info in profiles:
+        postal_codes = [info['postal_code']] + split_postal_codes(info.get('extra_postal_codes', ''))
+        for postal_code in dict.fromkeys(code.upper() for code in postal_codes):
+            for site in sites:
+                jobs.append(SearchJob(site, profile_name, info, postal_code, autobook.get(site, False)))
+    return jobs
+
+
+def slice_seconds(job_count, max_concurrency, personal_info):
+    """Turn length for each job, or None when every job fits in a slot at once."""
+    if job_count <= max_concurrency:
+        return None
+    return float(personal_info.get('job_slice_seconds', DEFAULT_SLICE_SECONDS))
+
+
+class JobScheduler:
+    """
+    Runs search jobs on the engine loop with a global concurrency limit.
+    The site flows only end when stopped, so when there are more jobs than
+    slots they take turns: a running job gives its slot back after
+    `slice_seconds` and queues up again behind the waiting ones.
+    """
+    def __init__(self, jobs, runner, max_concurrency=DEFAULT_MAX_CONCURRENCY, slice_seconds=DEFAULT_SLICE_SECONDS):
+        self.jobs = jobs
+        self.runner = runner
+        self.max_concurrency = max(1, max_concurrency)
+        self.slice_seconds = slice_seconds if len(jobs) > self.max_concurrency else None
+
+    async def run(self, search_running):
+        # asyncio.Semaphore wakes waiters in order, so a rotated job goes to the back
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        message = f"[Jobs] {len(self.jobs)} job(s), up to {self.max_concurrency} at a time"
+        if self.slice_seconds:
+            message += f", taking turns every {int(self.slice_seconds)}s"
+        log_message(message)
+        profiles = {job.profile_name: SharedBoolean(True) for job in self.jobs}
+        await asyncio.gather(*(self._run_job(job, semaphore, search_running, profiles[job.profile_name])
+                               for job in self.jobs))
+        return self.statuses()
+
+    async def _run_job(self, job, semaphore, search_running, profile_running):
+        while True:
+            async with semaphore:
+                if not search_running.get():
+                    self._set_status(job, STOPPED)
+                    return
+                if not profile_running.get():
+                    # Another job of this person booked an appointment
+                    self._set_status(job, DONE)
+                    return
+                job.started_at = job.started_at or time.time()
+                self._set_status(job, RUNNING)
+                job_running = JobRunning(search_running, self.slice_seconds, profile_running)
+                try:
+                    await self.runner(job, job_running)
+                    if job_running.rotated and search_running.get():
+                        self._set_status(job, PENDING)
+                        continue
+                    self._set_status(job, DONE if search_running.get() else STOPPED)
+                except Exception as e:
+                    job.error = str(e)
+                    self._set_status(job, FAILED)
+                job.finished_at = time.time()
+                return
+
+    def _set_status(self, job, status):
+        job.status = status
+        message = f"[Jobs] {job.name}: {status}"
+        if job.error and status == FAILED:
+            message += f" ({job.error})"
+        log_message(message)
+
+    def statuses(self):
+        return {job.name: job.status for job in self.jobs}
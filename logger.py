@@ -1,20 +1,192 @@
+import collections
+import logging
+import logging.handlers
+import queue
+import re
+import threading
+import time
 import languages
 
-default_message_queue  = []
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
 
-def log_message(message):
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+# "[RVSQ] ..." -> site 'RVSQ'
+SITE_PREFIX = re.compile(r'^\s*\[(\w+)\]')
+
+class LogRecord:
+    """One log line. The [DEBUG] translation only runs when `text` is read."""
+    __slots__ = ('seq', 'timestamp', 'level', 'site', 'message', '_text')
+
+    def __init__(self, seq, timestamp, level, site, message):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.level = level
+        self.site = site
+        self.message = message
+        self._text = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = translate(self.message)
+        return self._text
+
+    def __str__(self):
+        return self.text
+
+
+class MessageLog:
+    """
+    Bounded ring buffer of log records shared by the search threads and
+    the GUI. Readers ask for the records after the last sequence number
+    they saw, so nothing is re-read.
+    """
+    def __init__(self, capacity=5000):
+        self.records = collections.deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.sinks = []
+
+    def append(self, message, level=INFO, site=None):
+        with self.lock:
+            self.seq += 1
+            record = LogRecord(self.seq, time.time(), level, site, message)
+            self.records.append(record)
+            sinks = list(self.sinks)
+        for sink in sinks:
+            sink.put(record)
+        return record
+
+    def since(self, seq, min_level=DEBUG):
+        """Records newer than `seq`, oldest first. Cost depends only on how many are new."""
+        with self.lock:
+            # Sequence numbers are contiguous, so the new records are the last ones
+            count = min(self.seq - seq, len(self.records))
+            records = [self.records[-index] for index in range(count, 0, -1)]
+        return [record for record in records if record.level >= min_level]
+
+    @property
+    def last_seq(self):
+        with self.lock:
+            return self.seq
+
+    def add_sink(self, sink):
+        with self.lock:
+            self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        with self.lock:
+            if sink in self.sinks:
+                self.sinks.remove(sink)
+
+
+class RotatingFileSink:
+    """Writes records to a rotating log file from a background thread."""
+    def __init__(self, path='meulade.log', max_bytes=5 * 1024 * 1024, backup_count=5, min_level=DEBUG):
+        self.min_level = min_level
+        self.queue = queue.Queue()
+        self.handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        if record.level >= self.min_level:
+            self.queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            try:
+                self.handler.handle(logging.makeLogRecord({
+                    'msg': record.text,
+                    'levelno': record.level,
+                    'levelname': LEVEL_NAMES.get(record.level, 'INFO'),
+                    'created': record.timestamp,
+                    'msecs': (record.timestamp % 1) * 1000,
+                }))
+            except Exception:
+                pass
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+        self.handler.close()
+
+
+class StreamSink:
+    """Writes records to a text stream (stdout for the CLI) as they are logged."""
+    def __init__(self, stream, min_level=DEBUG):
+        self.stream = stream
+        self.min_level = min_level
+        self.lock = threading.Lock()
+
+    def put(self, record):
+        if record.level < self.min_level:
+            return
+        line = f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.timestamp))} {record.text}\n"
+        with self.lock:
+            try:
+                self.stream.write(line)
+                self.stream.flush()
+            except Exception:
+                pass
+
+
+default_log = MessageLog()
+_file_sink = None
+
+def enable_file_log(path='meulade.log', **options):
+    """Mirror every record to a rotating file (no-op if already enabled)."""
+    global _file_sink
+    if _file_sink is None:
+        _file_sink = RotatingFileSink(path, **options)
+        default_log.add_sink(_file_sink)
+    return _file_sink
+
+def disable_file_log():
+    global _file_sink
+    if _file_sink is not None:
+        default_log.remove_sink(_file_sink)
+        _file_sink.close()
+        _file_sink = None
+
+def enable_stream_log(stream, min_level=DEBUG):
+    sink = StreamSink(stream, min_level)
+    default_log.add_sink(sink)
+    return sink
+
+def guess_level(message):
+    stripped = message.lstrip()
+    if stripped.startswith("[DEBUG]"):
+        return DEBUG
+    if stripped.startswith("[ERROR"):
+        return ERROR
+    return INFO
+
+def log_message(message, level=None, site=None):
+    if site is None:
+        match = SITE_PREFIX.match(message)
+        if match and match.group(1) not in ('DEBUG', 'ERROR', 'ERROR1'):
+            site = match.group(1)
+    return default_log.append(message, level if level is not None else guess_level(message), site)
+
+def translate(message):
     # Translate debug messages
     if message.startswith("[DEBUG]"):
         debug_key = message.lower().replace("[debug] ", "debug_")
         translated_message = get_text(debug_key,)
         if translated_message != debug_key:  # If translation exists
             message = f"[DEBUG] {translated_message}"
-    
-    default_message_queue.append(message)
-    if len(default_message_queue) > 10:
-        default_message_queue.pop(0)
+    return message
 
 
 def get_text(key):
     """Get translated text for current language"""
-    return languages.translations.get('English', languages.translations['English']).get(key, key)
\ No newline at end of file
+    return languages.translations.get('English', languages.translations['English']).get(key, key)
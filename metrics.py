@@ -0,0 +1,277 @@
+import collections
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from logger import log_message
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+SNAPSHOT_FILE = 'metrics.json'
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def format_labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in key) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'avg': round(self.sum / self.count, 4) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 4),
+        }
+
+
+class Timer:
+    """`with metrics.timer('step_seconds', site='rvsq', step='search'):` records the block duration."""
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    """Counters, histograms and one-minute event rates, safe to update from any thread."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = collections.defaultdict(dict)
+        self.histograms = collections.defaultdict(dict)
+        self.events = collections.defaultdict(dict)
+        self.started_at = time.time()
+        # Called with ('inc' | 'observe', name, value, labels) after each update
+        self.listeners = []
+
+    def inc(self, name, value=1, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.counters[name]
+            series[key] = series.get(key, 0) + value
+            # Counters double as rate meters over the last minute
+            events = self.events[name].setdefault(key, collections.deque())
+            now = time.time()
+            events.append(now)
+            while events and events[0] < now - 60:
+                events.popleft()
+        self._notify('inc', name, value, labels)
+
+    def observe(self, name, value, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.histograms[name]
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+        self._notify('observe', name, value, labels)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, kind, name, value, labels):
+        for listener in self.listeners:
+            listener(kind, name, value, labels)
+
+    def timer(self, name, **labels):
+        return Timer(self, name, labels)
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            return {
+                'timestamp': now,
+                'uptime_seconds': round(now - self.started_at, 1),
+                'counters': {name: {format_labels(key): value for key, value in series.items()}
+                             for name, series in self.counters.items()},
+                'per_minute': {name: {format_labels(key): sum(1 for t in events if t >= now - 60)
+                                      for key, events in series.items()}
+                               for name, series in self.events.items()},
+                'histograms': {name: {format_labels(key): histogram.to_dict() for key, histogram in series.items()}
+                               for name, series in self.histograms.items()},
+            }
+
+    def prometheus(self):
+        """Text exposition format, for scraping or curl."""
+        lines = []
+        with self.lock:
+            for name, series in self.counters.items():
+                lines.append(f'# TYPE meulade_{name} counter')
+                for key, value in series.items():
+                    lines.append(f'meulade_{name}{format_labels(key)} {value}')
+            for name, series in self.histograms.items():
+                lines.append(f'# TYPE meulade_{name} histogram')
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                        cumulative += count
+                        lines.append(f'meulade_{name}_bucket{format_labels(key + (("le", bound),))} {cumulative}')
+                    lines.append(f'meulade_{name}_sum{format_labels(key)} {histogram.sum}')
+                    lines.append(f'meulade_{name}_count{format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+default_registry = Registry()
+
+def inc(name, value=1, **labels):
+    default_registry.inc(name, value, **labels)
+
+def observe(name, value, **labels):
+    default_registry.observe(name, value, **labels)
+
+def timer(name, **labels):
+    return default_registry.timer(name, **labels)
+
+def timed(name, **labels):
+    """Decorator recording the duration of every call of a coroutine function."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Extra JSON endpoints served by the exporter: path -> producer(query params)
+_endpoints = {}
+
+def register_endpoint(path, producer):
+    _endpoints[path] = producer
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = default_registry
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in _endpoints:
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            body = json.dumps(_endpoints[url.path](query), indent=2).encode('utf-8')
+            content_type = 'application/json'
+        elif self.path.startswith('/metrics.json'):
+            body = json.dumps(self.registry.snapshot(), indent=2).encode('utf-8')
+            content_type = 'application/json'
+        elif self.path.startswith('/metrics'):
+            body = self.registry.prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scrapes out of the GUI log
+        pass
+
+
+class MetricsExporter:
+    """
+    Serves /metrics (Prometheus text) and /metrics.json on localhost and
+    writes a JSON snapshot every `interval` seconds. Both run on daemon threads.
+    """
+    def __init__(self, registry=default_registry, port=9464, snapshot_path=SNAPSHOT_FILE, interval=60):
+        self.registry = registry
+        self.port = port
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self.server = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        if self.port:
+            handler = type('Handler', (MetricsHandler,), {'registry': self.registry})
+            try:
+                self.server = ThreadingHTTPServer(('127.0.0.1', self.port), handler)
+                threading.Thread(target=self.server.serve_forever, daemon=True).start()
+                log_message(f"[Metrics] Serving http://127.0.0.1:{self.port}/metrics")
+            except OSError as e:
+                log_message(f"[Metrics] Could not listen on port {self.port}: {e}")
+        if self.snapshot_path:
+            threading.Thread(target=self._snapshot_loop, daemon=True).start()
+        return self
+
+    def _snapshot_loop(self):
+        while not self.stopped.wait(self.interval):
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'w') as f:
+                json.dump(self.registry.snapshot(), f, indent=2)
+        except Exception as e:
+            log_message(f"[Metrics] Could not write {self.snapshot_path}: {e}")
+
+    def stop(self):
+        self.stopped.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.snapshot_path:
+            self.write_snapshot()
+
+
+_exporter = None
+
+def start_exporter(port=9464, **options):
+    """Start the shared exporter once per process."""
+    global _exporter
+    if _exporter is None:
+        _exporter = MetricsExporter(port=port, **options).start()
+    return _exporter
+
+def stop_exporter():
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
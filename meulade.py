@@ -1,23 +1,19 @@
-import gui
 import sys
 import subprocess
+import multiprocessing
 from logger import log_message
+from browser_pool import chromium_installed
 
 def ensure_playwright_browsers():
     """Ensure Playwright browsers are installed."""
+    # Checked on disk: launching Chromium just to see if it exists costs seconds
+    if chromium_installed():
+        return
     try:
-        from playwright.sync_api import sync_playwright
-        with sync_playwright() as p:
-            # Check if chromium is available (we mostly use chromium)
-            try:
-                p.chromium.launch()
-                return
-            except Exception:
-                pass # Browser not found or other issue, try installing
-
         print("Installing Playwright browsers... This may take a minute.")
         log_message("Installing Playwright browsers...")
         subprocess.check_call([sys.executable, "-m", "playwright", "install", "chromium"])
+        chromium_installed.cache_clear()
         print("Playwright browsers installed successfully.")
         log_message("Playwright browsers installed successfully.")
 
@@ -26,7 +22,11 @@ def ensure_playwright_browsers():
         log_message(f"Error checking/installing Playwright browsers: {e}")
 
 def main():
+    # Worker processes of a frozen build re-enter here
+    multiprocessing.freeze_support()
     ensure_playwright_browsers()
+    # The GUI (customtkinter, PIL) is only imported once we know we need it
+    import gui
     app = gui.AppGUI()
     app.run()
 
@@ -0,0 +1,148 @@
+import json
+import os
+import random
+import threading
+from datetime import datetime
+from logger import log_message
+
+HISTORY_FILE = 'pacing_history.json'
+
+# Worker processes turn this off and forward their polls through
+# history_listeners instead, so only the supervisor writes HISTORY_FILE
+persist_history = True
+# Called with (site, found, timestamp) for every recorded poll
+history_listeners = []
+
+class FixedJitterPacer:
+    """The historical behaviour: a uniform random delay per site."""
+    def __init__(self, ranges=None):
+        self.ranges = ranges or {'rvsq': (1000, 5000), 'bonjoursante': (2000, 10000)}
+
+    def next_delay(self, site):
+        low, high = self.ranges.get(site, (1000, 5000))
+        return random.randint(low, high)
+
+    def record(self, site, found):
+        pass
+
+
+class SlotHistory:
+    """
+    Per-site counts of polls and slot sightings by weekday and hour,
+    persisted to a small JSON file so learning survives restarts.
+    """
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {}
+        self.dirty = 0
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.data = json.load(f)
+            except Exception as e:
+                log_message(f"[Pacing] Could not read {path}: {e}")
+
+    def _bucket(self, site, when):
+        key = f"{when.weekday()}:{when.hour}"
+        return self.data.setdefault(site, {}).setdefault(key, [0, 0])
+
+    def record(self, site, found, when=None):
+        when = when or datetime.now()
+        with self.lock:
+            bucket = self._bucket(site, when)
+            bucket[0] += 1
+            if found:
+                bucket[1] += 1
+            self.dirty += 1
+            if persist_history and (found or self.dirty >= 50):
+                self._save()
+        for listener in history_listeners:
+            listener(site, found, when.timestamp())
+
+    def flush(self):
+        with self.lock:
+            if self.dirty:
+                self._save()
+
+    def rate(self, site, when):
+        """Slots seen per poll in this weekday/hour, smoothed towards the site average."""
+        with self.lock:
+            buckets = self.data.get(site, {})
+            polls, found = buckets.get(f"{when.weekday()}:{when.hour}", [0, 0])
+            total_polls = sum(b[0] for b in buckets.values())
+            total_found = sum(b[1] for b in buckets.values())
+        if total_polls == 0 or total_found == 0:
+            return None
+        average = total_found / total_polls
+        # Laplace-style prior: a bucket needs ~20 polls before it outweighs the average
+        return (found + average * 20) / (polls + 20), average
+
+    def _save(self):
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(self.data, f)
+            self.dirty = 0
+        except Exception as e:
+            log_message(f"[Pacing] Could not save {self.path}: {e}")
+
+
+class AdaptivePacer:
+    """
+    Polls faster in hours where slots were seen before, slower overnight
+    and after long runs of empty results. Never goes below the jitter
+    floor, and the delay is always randomised.
+    """
+    def __init__(self, history=None, base_ms=3000, floor_ms=1000, ceiling_ms=60000,
+                 night_hours=(0, 6), night_factor=4.0, empty_streak_step=20):
+        self.history = history or SlotHistory()
+        self.base_ms = base_ms
+        self.floor_ms = floor_ms
+        self.ceiling_ms = ceiling_ms
+        self.night_hours = night_hours
+        self.night_factor = night_factor
+        self.empty_streak_step = empty_streak_step
+        self.empty_streaks = {}
+
+    def factor(self, site, now):
+        factor = 1.0
+        start, end = self.night_hours
+        if start <= now.hour < end:
+            factor *= self.night_factor
+        rates = self.history.rate(site, now)
+        if rates:
+            rate, average = rates
+            # Hot hours (above average) speed up, cold ones slow down, within 4x
+            factor *= min(4.0, max(0.25, average / rate if rate else 4.0))
+        # Every `empty_streak_step` empty polls in a row adds 25 %, up to 3x
+        streak = self.empty_streaks.get(site, 0)
+        factor *= min(3.0, 1.0 + 0.25 * (streak // self.empty_streak_step))
+        return factor
+
+    def next_delay(self, site):
+        target = self.base_ms * self.factor(site, datetime.now())
+        delay = random.uniform(0.5, 1.5) * target
+        # The floor keeps its own jitter so clamped delays are not constant
+        return int(min(self.ceiling_ms, max(self.floor_ms * random.uniform(1.0, 1.5), delay)))
+
+    def record(self, site, found):
+        self.history.record(site, found)
+        self.empty_streaks[site] = 0 if found else self.empty_streaks.get(site, 0) + 1
+
+
+def make_pacer(personal_info):
+    """Pacer selected by personal_info['pacing']: 'fixed' (default) or 'adaptive'."""
+    if personal_info.get('pacing', 'fixed') == 'adaptive':
+        return AdaptivePacer(floor_ms=int(personal_info.get('jitter_floor_ms', 1000)))
+    return FixedJitterPacer()
+
+_shared_pacers = {}
+_shared_lock = threading.Lock()
+
+def get_pacer(personal_info):
+    """One pacer per mode and process, so every job feeds the same history."""
+    mode = personal_info.get('pacing', 'fixed')
+    with _shared_lock:
+        if mode not in _shared_pacers:
+            _shared_pacers[mode] = make_pacer(personal_info)
+        return _shared_pacers[mode]
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from logger import log_message
+import metrics
+
+# Seconds without a heartbeat before a search counts as stalled
+DEFAULT_BUDGET = 180
+CHECK_INTERVAL = 2
+CLOSE_TIMEOUT = 10
+
+class Watchdog:
+    """
+    Heartbeat monitor for one search loop.
+
+    The loop calls beat() as it makes progress and expect() before a wait
+    it knows will be long (backoff, pacing, holding a slot). If the
+    deadline passes anyway, a Playwright call is stuck beyond its own
+    timeout (hung renderer, evaluate without timeout...): the watchdog
+    closes the page, which makes the pending call raise so the loop's
+    usual recovery takes over. If that does not bring a heartbeat back
+    within another budget, the whole context is closed.
+    """
+    def __init__(self, site, key, budget=DEFAULT_BUDGET):
+        self.site = site
+        self.key = key
+        self.budget = budget
+        self.page = None
+        self.context = None
+        self.stage = 'start'
+        self.deadline = time.monotonic() + budget
+        self.escalated = False
+        self.interventions = 0
+        self.task = None
+
+    def attach(self, page, context):
+        self.page = page
+        self.context = context
+        self.beat('attach')
+
+    def beat(self, stage=None):
+        if stage:
+            self.stage = stage
+        self.deadline = time.monotonic() + self.budget
+        self.escalated = False
+
+    def expect(self, seconds, stage):
+        """Beat, allowing an extra `seconds` of silence for a known wait."""
+        self.beat(stage)
+        self.deadline += seconds
+
+    async def hold(self, seconds, search_running):
+        """Stay idle for `seconds` (e.g. while a slot is on screen), beating and waking early on stop."""
+        end = time.monotonic() + seconds
+        # A job taking turns keeps its slot while the slot is on screen
+        defer_rotation = getattr(search_running, 'defer_rotation', None)
+        if defer_rotation:
+            defer_rotation(seconds)
+        while search_running.get() and time.monotonic() < end:
+            self.beat('hold')
+            await asyncio.sleep(min(1, end - time.monotonic()))
+
+    def start(self):
+        owner = asyncio.current_task()
+        self.task = asyncio.get_running_loop().create_task(self._monitor(owner))
+        return self
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def _monitor(self, owner):
+        while not owner.done():
+            await asyncio.sleep(CHECK_INTERVAL)
+            overdue = time.monotonic() - self.deadline
+            if overdue < 0 or self.page is None:
+                continue
+            if not self.escalated and not self.page.is_closed():
+                await self._intervene('page', self.page.close())
+                self.escalated = True
+                self.deadline = time.monotonic() + self.budget
+            elif self.context is not None:
+                await self._intervene('context', self.context.close())
+                self.context = None
+                self.page = None
+
+    async def _intervene(self, action, closing):
+        self.interventions += 1
+        metrics.inc('watchdog_interventions_total', site=self.site, stage=self.stage, action=action)
+        log_message(f"[Watchdog] {self.key}: no progress in '{self.stage}' for {int(self.budget)}s, closing the {action}")
+        try:
+            await asyncio.wait_for(closing, CLOSE_TIMEOUT)
+        except Exception as e:
+            log_message(f"[Watchdog] {self.key}: closing the {action} failed: {e}")
+
+
+def from_config(site, key, personal_info):
+    return Watchdog(site, key, float(personal_info.get('watchdog_seconds', DEFAULT_BUDGET)))
@@ -0,0 +1,94 @@
+from urllib.parse import urlparse
+from logger import log_message
+
+# Per-site rules.
+# block_types: resource types never needed by the flows, blocked at all times.
+# allow_domains: first-party and required third-party hosts (Cloudflare challenge, CDNs).
+# deny_patterns: URL fragments (analytics, consent widgets) blocked once polling starts.
+# block_third_party: also block scripts/xhr from hosts not in allow_domains while polling.
+SITE_RULES = {
+    'rvsq': {
+        'block_types': ['image', 'font', 'media'],
+        'allow_domains': ['rvsq.gouv.qc.ca', 'gouv.qc.ca', 'cloudflare.com', 'ajax.googleapis.com', 'code.jquery.com', 'cdnjs.cloudflare.com', 'cdn.jsdelivr.net'],
+        'deny_patterns': ['google-analytics', 'googletagmanager', 'doubleclick', 'hotjar', 'facebook.net', 'clarity.ms'],
+        'block_third_party': True,
+    },
+    'bonjoursante': {
+        'block_types': ['image', 'font', 'media'],
+        'allow_domains': ['bonjour-sante.ca', 'cloudflare.com', 'cdnjs.cloudflare.com', 'cdn.jsdelivr.net'],
+        'deny_patterns': ['google-analytics', 'googletagmanager', 'doubleclick', 'hotjar', 'facebook.net', 'clarity.ms', 'didomi', 'privacy-center.org'],
+        'block_third_party': True,
+    },
+}
+
+THIRD_PARTY_TYPES = {'script', 'xhr', 'fetch', 'stylesheet', 'other'}
+
+def host_matches(host, domains):
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+class ResourceFilter:
+    """
+    page.route-style filter attached to a BrowserContext.
+
+    Blocked requests are aborted before they leave the browser. The bytes
+    they would have cost are only a partial estimate: a size is known for
+    URLs the filter let through earlier (setup phase), never for the
+    always-blocked types, so blocked_bytes covers the `blocked_sized`
+    requests only.
+    """
+    def __init__(self, site, rules=None):
+        self.site = site
+        self.rules = rules or SITE_RULES[site]
+        self.polling = False
+        self.known_sizes = {}
+        self.blocked_requests = 0
+        self.blocked_bytes = 0
+        self.blocked_sized = 0
+        self.allowed_requests = 0
+        self.blocked_by_type = {}
+
+    def should_block(self, url, resource_type):
+        rules = self.rules
+        if resource_type in rules.get('block_types', []):
+            return True
+        if not self.polling:
+            return False
+        if any(pattern in url for pattern in rules.get('deny_patterns', [])):
+            return True
+        if rules.get('block_third_party') and resource_type in THIRD_PARTY_TYPES:
+            host = urlparse(url).hostname or ''
+            if host and not host_matches(host, rules.get('allow_domains', [])):
+                return True
+        return False
+
+    async def handle(self, route, request):
+        if self.should_block(request.url, request.resource_type):
+            self.blocked_requests += 1
+            if request.url in self.known_sizes:
+                self.blocked_bytes += self.known_sizes[request.url]
+                self.blocked_sized += 1
+            self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+            await route.abort('blockedbyclient')
+        else:
+            self.allowed_requests += 1
+            await route.fallback()
+
+    def on_response(self, response):
+        length = response.headers.get('content-length')
+        if length and length.isdigit() and len(self.known_sizes) < 5000:
+            self.known_sizes[response.url] = int(length)
+
+    def summary(self):
+        by_type = ", ".join(f"{count} {kind}" for kind, count in sorted(self.blocked_by_type.items()))
+        return (f"blocked {self.blocked_requests} requests ({by_type or 'none'}; "
+                f"~{self.blocked_bytes // 1024} KB known for {self.blocked_sized} of them), "
+                f"allowed {self.allowed_requests}")
+
+
+async def install(context, site, rules=None):
+    """Attach a ResourceFilter to every request made by `context`."""
+    resource_filter = ResourceFilter(site, rules)
+    await context.route('**/*', resource_filter.handle)
+    context.on('response', resource_filter.on_response)
+    log_message(f"[Filter] Request filtering enabled for {site}")
+    return resource_filter
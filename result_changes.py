@@ -0,0 +1,118 @@
+import collections
+import threading
+import time
+from logger import log_message, DEBUG
+import metrics
+
+# Every Nth poll is classified in full even if the fingerprint did not
+# move, in case something outside the fingerprinted regions changed
+FULL_CHECK_EVERY = 20
+
+class ChangeEvent:
+    """The results region of one search changed."""
+    __slots__ = ('seq', 'timestamp', 'site', 'key', 'fingerprint', 'status', 'previous_status', 'detail')
+
+    def __init__(self, seq, timestamp, site, key, fingerprint, status, previous_status, detail):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.site = site
+        self.key = key
+        self.fingerprint = fingerprint
+        self.status = status
+        self.previous_status = previous_status
+        self.detail = detail
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ChangeStream:
+    """
+    Bounded history of result changes, read like the message log: consumers
+    ask for the events after the last sequence number they saw. Also served
+    as JSON on the metrics exporter at /changes?since=<seq>.
+    """
+    def __init__(self, capacity=1000):
+        self.events = collections.deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.listeners = []
+
+    def append(self, site, key, fingerprint, status, previous_status, detail=''):
+        with self.lock:
+            self.seq += 1
+            event = ChangeEvent(self.seq, time.time(), site, key, fingerprint, status, previous_status, detail)
+            self.events.append(event)
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(event)
+        return event
+
+    def since(self, seq):
+        with self.lock:
+            count = min(self.seq - seq, len(self.events))
+            return [self.events[-index] for index in range(count, 0, -1)]
+
+    def add_listener(self, listener):
+        with self.lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+
+default_stream = ChangeStream()
+
+metrics.register_endpoint('/changes', lambda query: [event.to_dict() for event in default_stream.since(int(query.get('since', 0)))])
+
+
+class ResultTracker:
+    """
+    Last fingerprint and classification of one search's results region.
+    The page only runs the full classification when its fingerprint
+    differs from expected(); otherwise the previous result is reused.
+    """
+    def __init__(self, site, key, stream=None, full_check_every=FULL_CHECK_EVERY):
+        self.site = site
+        self.key = key
+        self.stream = stream or default_stream
+        self.full_check_every = full_check_every
+        self.reset()
+
+    def reset(self):
+        """Forget the last page state (new page or context)."""
+        self.fingerprint = None
+        self.result = None
+        self.unchanged_polls = 0
+
+    def expected(self):
+        """Fingerprint to compare against in the page, None to force a full classification."""
+        if self.result is None or self.unchanged_polls + 1 >= self.full_check_every:
+            return None
+        return self.fingerprint
+
+    def update(self, fingerprint, result):
+        """
+        Record a poll. `result` is None when the page reported the
+        fingerprint unchanged. Returns (result, changed).
+        """
+        if result is None:
+            self.unchanged_polls += 1
+            metrics.inc('classifications_skipped_total', site=self.site)
+            return self.result, False
+        previous = self.result
+        changed = previous is None or fingerprint != self.fingerprint or result.status != previous.status
+        self.fingerprint = fingerprint
+        self.result = result
+        self.unchanged_polls = 0
+        if changed:
+            previous_status = previous.status if previous else None
+            self.stream.append(self.site, self.key, fingerprint, result.status, previous_status, result.detail)
+            metrics.inc('result_changes_total', site=self.site, status=result.status)
+            if previous_status != result.status:
+                log_message(f"[Changes] {self.key}: {previous_status or 'start'} -> {result.status}")
+            else:
+                log_message(f"[Changes] {self.key}: results changed ({result.status}, {fingerprint})", DEBUG)
+        return result, changed
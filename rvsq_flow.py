@@ -0,0 +1,264 @@
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from logger import log_message
+import rvsq_http
+
+RVSQ_URL = 'https://rvsq.gouv.qc.ca/prendrerendezvous/Principale.aspx'
+DEFAULT_REASON_ID = 'ac2a5fa4-8514-11ef-a759-005056b11d6c'
+
+# Returns, for each selector, whether a matching element is rendered and visible
+VISIBILITY_SCRIPT = """
+(selectors) => selectors.map(sel => {
+    const el = document.querySelector(sel);
+    if (!el) return false;
+    const style = window.getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    return style.display !== 'none' && style.visibility !== 'hidden' && rect.width > 0 && rect.height > 0;
+})
+"""
+
+# Elements that only exist once a search has rendered its results
+RESULT_SELECTORS = ['#clinicsWithNoDisponibilities', '#ClinicList li']
+
+# Stamps the result elements currently on the page and starts a mutation
+# clock, so the next search can tell fresh results from the previous ones.
+# The observer of the previous search is disconnected first.
+ARM_RESULTS_SCRIPT = """
+(selectors) => {
+    const token = String(Date.now()) + Math.random();
+    selectors.forEach(sel => document.querySelectorAll(sel).forEach(el => el.dataset.meuladeStamp = token));
+    const previous = window.__meuladeSearch;
+    if (previous && previous.observer) previous.observer.disconnect();
+    const state = window.__meuladeSearch = {token: token, lastMutation: performance.now()};
+    state.observer = new MutationObserver(() => { state.lastMutation = performance.now(); });
+    state.observer.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+    return token;
+}
+"""
+
+# Restarts the quiet clock once the search response is in, so the quiet
+# period only counts from when the results can start rendering
+RESPONSE_SEEN_SCRIPT = """
+(token) => {
+    const state = window.__meuladeSearch;
+    if (state && state.token === token) state.lastMutation = performance.now();
+}
+"""
+
+# Results are ready when a result element that was not stamped is visible,
+# or, for in-place updates, once the DOM has been quiet for `quietMs` since
+# the response (RESPONSE_SEEN_SCRIPT)
+RESULTS_READY_SCRIPT = """
+({token, selectors, quietMs}) => {
+    const visible = el => {
+        const style = window.getComputedStyle(el);
+        const rect = el.getBoundingClientRect();
+        return style.display !== 'none' && style.visibility !== 'hidden' && rect.width > 0 && rect.height > 0;
+    };
+    const fresh = selectors.some(sel => Array.from(document.querySelectorAll(sel)).some(el => el.dataset.meuladeStamp !== token && visible(el)));
+    if (fresh) return true;
+    const state = window.__meuladeSearch;
+    if (!state || state.token !== token) return false;
+    return performance.now() - state.lastMutation > quietMs;
+}
+"""
+
+class FlowError(Exception):
+    """The page is in a state the flow cannot continue from."""
+
+class Step:
+    """
+    One named step of the RVSQ flow.
+
+    `entry` lists the selectors that must all be visible for the live page
+    to be on this step, `requires` lists the flow state keys set by earlier
+    steps that this one depends on.
+    """
+    def __init__(self, name, entry, run=None, requires=()):
+        self.name = name
+        self.entry = entry
+        self.run = run
+        self.requires = requires
+
+
+async def dismiss_consent(page):
+    if (await page.evaluate(VISIBILITY_SCRIPT, ['#btnToutAccepter']))[0]:
+        log_message("[RVSQ] Accepting cookies...")
+        await page.locator('#btnToutAccepter').click()
+
+async def step_open(page, personal_info, state):
+    log_message("[RVSQ] Navigating to form page...")
+    # Overridable so the flow can run against a local stand-in (benchmarks/mock_sites.py)
+    await page.goto(personal_info.get('rvsq_url', RVSQ_URL), timeout=60000, wait_until='networkidle')
+    await dismiss_consent(page)
+
+async def step_identity(page, personal_info, state):
+    log_message("[RVSQ] Filling form fields...")
+    await page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_FirstName', personal_info['first_name'])
+    await page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_LastName', personal_info['last_name'])
+    await page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_NAM', personal_info['nam'])
+    await page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_CardSeqNumber', personal_info['card_seq_number'])
+
+    # Fill birth date fields
+    await page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_Day', personal_info['birth_day'])
+    await page.select_option('#ctl00_ContentPlaceHolderMP_AssureForm_Month', personal_info['birth_month'])
+    await page.fill('#ctl00_ContentPlaceHolderMP_AssureForm_Year', personal_info['birth_year'])
+
+    log_message("[RVSQ] Checking consent checkbox...")
+    await page.check('#AssureForm_CSTMT')
+
+    log_message("[RVSQ] Waiting for Continue button...")
+    await page.wait_for_selector('#ctl00_ContentPlaceHolderMP_myButton:not([disabled])')
+
+    log_message("[RVSQ] Clicking Continue button...")
+    await page.click('#ctl00_ContentPlaceHolderMP_myButton')
+
+    log_message("[RVSQ] Waiting for navigation...")
+    await page.wait_for_load_state('networkidle')
+
+async def step_family_doctor(page, personal_info, state):
+    log_message("[RVSQ] Checking if user has a family doctor...")
+
+    # Wait for either choice to render instead of a fixed delay
+    await page.locator("a.h-SelectAssureBtn.ctx-changer").or_(page.get_by_text("pas de médecin de famille")).first.wait_for(state='visible', timeout=15000)
+
+    # Check for family doctor
+    has_family_doctor = await page.locator("a.h-SelectAssureBtn.ctx-changer[data-type='1']").is_visible()
+    no_family_doctor = await page.locator("text=pas de médecin de famille").is_visible()
+
+    if no_family_doctor:
+        log_message("[RVSQ] No family doctor detected, proceeding with appointment search...")
+        log_message("[RVSQ] Clicking proximity button for no family doctor case...")
+        await page.click("a.h-SelectAssureBtn.ctx-changer[data-type='3']")
+        has_family_doctor = False
+    elif has_family_doctor:
+        log_message("[RVSQ] Family doctor detected, proceeding with appointment search...")
+        await page.click("a.h-SelectAssureBtn.ctx-changer[data-type='1']")
+    else:
+        raise FlowError("Could not determine family doctor status")
+    state['has_family_doctor'] = has_family_doctor
+
+async def step_reason(page, personal_info, state):
+    has_family_doctor = state['has_family_doctor']
+
+    log_message("[RVSQ] Waiting for dropdown...")
+    await page.wait_for_selector('#consultingReason', state='visible', timeout=60000)
+
+    log_message("[RVSQ] Selecting Consultation Reason...")
+    reason_id = personal_info.get('reason_id', DEFAULT_REASON_ID)
+    # Options are filled in asynchronously
+    await page.wait_for_selector(f'#consultingReason option[value="{reason_id}"]', state='attached')
+    await page.click('#consultingReason')
+    await page.select_option('#consultingReason', reason_id)
+
+    if not has_family_doctor:
+        log_message("[RVSQ] Setting 50km radius...")
+        await page.wait_for_selector('#perimeterCombo', state='visible')
+
+    log_message("[RVSQ] Clicking 'Rechercher' button...")
+    await page.click('button:has-text("Rechercher")')
+    await page.wait_for_load_state('networkidle')
+
+    if has_family_doctor:
+        log_message("[RVSQ] Clicking GMF button...")
+        await page.click('div.thumbnail.tmbArrow.tmbBtn.h-butType2dot2:has-text("Prendre rendez-vous avec un professionnel de la santé de mon groupe de médecine de famille (GMF)")')
+
+        log_message("[RVSQ] Clicking 'Rechercher' again...")
+        await page.click('button:has-text("Rechercher")')
+        await page.wait_for_load_state('networkidle')
+        await page.click('div.thumbnail.tmbArrow.tmbBtn.h-butType3:has-text("Prendre rendez-vous dans une clinique à proximité")')
+    else:
+        await page.wait_for_load_state('networkidle')
+
+        log_message("[RVSQ] Clicking 'Rechercher' again...")
+        await page.click('button:has-text("Rechercher")')
+        await page.wait_for_load_state('networkidle')
+
+    try:
+        await page.select_option('#perimeterCombo', '0')
+    except:
+        try:
+            await page.click('#perimeterCombo')
+            await page.select_option('#perimeterCombo', value='0')
+        except:
+            await page.evaluate('document.getElementById("perimeterCombo").value = "0"')
+    state['search_ready'] = True
+
+
+# Ordered checkpoints. The last one is the search form polled by the engine.
+STEPS = [
+    Step('open', [], step_open),
+    Step('identity', ['#ctl00_ContentPlaceHolderMP_AssureForm_FirstName'], step_identity),
+    Step('family_doctor', ['a.h-SelectAssureBtn.ctx-changer'], step_family_doctor),
+    Step('reason', ['#consultingReason'], step_reason, requires=('has_family_doctor',)),
+    Step('search', ['#PostalCode', 'button.h-SearchButton'], requires=('search_ready',)),
+]
+
+def step_index(name):
+    return [step.name for step in STEPS].index(name)
+
+async def detect_step(page, state):
+    """
+    Find the furthest step whose entry checks hold on the live page.
+    Returns the step, or None if the page matches no checkpoint.
+    """
+    if page.is_closed():
+        return None
+    candidates = [step for step in STEPS if step.entry and all(key in state for key in step.requires)]
+    selectors = [sel for step in candidates for sel in step.entry]
+    visible = dict(zip(selectors, await page.evaluate(VISIBILITY_SCRIPT, selectors)))
+    for step in reversed(candidates):
+        if all(visible[sel] for sel in step.entry):
+            return step
+    return None
+
+async def reach_search(page, personal_info, state):
+    """
+    Bring the page to the search form, resuming from the nearest checkpoint
+    when the page is already part-way through the flow.
+    """
+    start = 0
+    if page.url.startswith('http'):
+        try:
+            await dismiss_consent(page)
+            current = await detect_step(page, state)
+        except Exception:
+            current = None
+        if current:
+            start = step_index(current.name)
+            if current.name != 'search':
+                log_message(f"[RVSQ] Resuming from step '{current.name}'")
+    for step in STEPS[start:]:
+        if step.run:
+            state['step'] = step.name
+            await step.run(page, personal_info, state)
+    state['step'] = 'search'
+
+async def search_and_wait(page, action, timeout=10000, quiet_ms=300):
+    """
+    Run `action` (the search click) and return as soon as the results are
+    rendered: waits for the search response, then for fresh result
+    elements or a quiet DOM, bounded by `timeout` ms.
+    Returns whatever `action` returned.
+    """
+    token = await page.evaluate(ARM_RESULTS_SCRIPT, RESULT_SELECTORS)
+    result = None
+    acted = False
+    try:
+        async with page.expect_response(lambda response: rvsq_http.is_search_request(response.request), timeout=timeout):
+            result = await action()
+            acted = True
+    except PlaywrightTimeoutError:
+        if not acted:
+            raise
+        log_message("[RVSQ] No search response seen, checking the page anyway...")
+    await page.evaluate(RESPONSE_SEEN_SCRIPT, token)
+    try:
+        await page.wait_for_function(
+            RESULTS_READY_SCRIPT,
+            arg={'token': token, 'selectors': RESULT_SELECTORS, 'quietMs': quiet_ms},
+            timeout=timeout,
+            polling=100
+        )
+    except PlaywrightTimeoutError:
+        log_message(f"[RVSQ] Results not rendered after {timeout // 1000}s")
+    return result
@@ -0,0 +1,183 @@
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode
+from logger import log_message
+import classifier
+import circuit
+
+# ASP.NET form state refreshed by every postback
+STATE_FIELDS = ['__VIEWSTATE', '__VIEWSTATEGENERATOR', '__EVENTVALIDATION', '__PREVIOUSPAGE']
+
+# Headers the HTTP client computes itself
+SKIPPED_HEADERS = {'content-length', 'host', 'cookie', 'connection', 'accept-encoding'}
+
+ERROR_CLASSES = {sel for sel in classifier.ERROR_SELECTORS if sel.startswith('.')}
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+class ResultPageParser(HTMLParser):
+    """
+    Collects the RVSQ result indicators from a search response without a
+    browser: whether #clinicsWithNoDisponibilities is shown, how many
+    clinics #ClinicList holds, and the hidden form state fields.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.no_slots_element = False
+        self.clinic_count = 0
+        self.error = False
+        self.state_fields = {}
+        self.text_parts = []
+
+    def _hidden(self, attrs):
+        style = (attrs.get('style') or '').replace(' ', '').lower()
+        return 'hidden' in attrs or 'display:none' in style or 'visibility:hidden' in style
+
+    def _in(self, element_id):
+        return any(entry[0] == element_id for entry in self.stack)
+
+    def _in_tag(self, tag):
+        return any(entry[2] == tag for entry in self.stack)
+
+    def _shown(self):
+        return not any(entry[1] for entry in self.stack)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'input' and attrs.get('name') in STATE_FIELDS:
+            self.state_fields[attrs['name']] = attrs.get('value') or ''
+        element_id = attrs.get('id')
+        hidden = self._hidden(attrs)
+        if element_id == 'clinicsWithNoDisponibilities' and not hidden and self._shown():
+            self.no_slots_element = True
+        if tag == 'li' and self._in('ClinicList') and not hidden and self._shown():
+            self.clinic_count += 1
+        classes = {'.' + name for name in (attrs.get('class') or '').split()}
+        if classes & ERROR_CLASSES and not hidden and self._shown():
+            self.error = True
+        if tag not in VOID_TAGS:
+            self.stack.append((element_id, hidden, tag))
+
+    def handle_endtag(self, tag):
+        # Tolerate unbalanced markup: pop up to the matching tag
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][2] == tag:
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        if self._shown() and not self._in_tag('script') and not self._in_tag('style'):
+            self.text_parts.append(data)
+
+
+def parse_delta_state(body):
+    """
+    Extract refreshed hidden fields from an ASP.NET UpdatePanel delta
+    response (`length|type|id|content|` records).
+    """
+    fields = {}
+    position = 0
+    while position < len(body):
+        try:
+            separator = body.index('|', position)
+            length = int(body[position:separator])
+            type_end = body.index('|', separator + 1)
+            record_type = body[separator + 1:type_end]
+            id_end = body.index('|', type_end + 1)
+            record_id = body[type_end + 1:id_end]
+            content = body[id_end + 1:id_end + 1 + length]
+        except ValueError:
+            break
+        if record_type == 'hiddenField' and record_id in STATE_FIELDS:
+            fields[record_id] = content
+        elif record_type == 'pageRedirect':
+            fields['pageRedirect'] = content
+        position = id_end + 1 + length + 1
+    return fields
+
+def classify_response(body):
+    """
+    Classify a search response without a browser.
+    Returns (SearchResult, state_fields).
+    """
+    parser = ResultPageParser()
+    parser.feed(body)
+    parser.close()
+    state_fields = dict(parser.state_fields)
+    if body[:1].isdigit() and '|' in body[:20]:
+        state_fields.update(parse_delta_state(body))
+    if 'pageRedirect' in state_fields:
+        return classifier.SearchResult(classifier.UNKNOWN, detail='Redirected'), state_fields
+
+    text = ' '.join(' '.join(parser.text_parts).split())
+    indicators = {
+        'no_slots_element': parser.no_slots_element,
+        'no_slots_text': any(marker in text for marker in classifier.NO_SLOTS_TEXTS),
+        'clinic_section': classifier.CLINIC_SECTION_TEXT in text,
+        'clinic_count': parser.clinic_count,
+        'error': parser.error,
+    }
+    return classifier.classify_indicators(indicators), state_fields
+
+
+class CapturedSearch:
+    """The request fired by the RVSQ search button, ready to be replayed."""
+    def __init__(self, url, method, headers, post_data):
+        self.url = url
+        self.method = method
+        self.headers = {k: v for k, v in headers.items() if k.lower() not in SKIPPED_HEADERS and not k.startswith(':')}
+        self.post_data = post_data
+
+    def update_state(self, state_fields):
+        """Carry refreshed __VIEWSTATE & co. into the next replay."""
+        if not self.post_data or not state_fields:
+            return
+        form = parse_qsl(self.post_data, keep_blank_values=True)
+        self.post_data = urlencode([(key, state_fields.get(key, value)) for key, value in form])
+
+
+def is_search_request(request):
+    return request.method == 'POST' and request.resource_type in ('document', 'xhr', 'fetch')
+
+async def capture_search(page, selector, timeout=15000):
+    """Click the search button and capture the request it triggers."""
+    async with page.expect_request(is_search_request, timeout=timeout) as request_info:
+        await page.click(selector)
+    request = await request_info.value
+    headers = await request.all_headers()
+    return CapturedSearch(request.url, request.method, headers, request.post_data)
+
+
+class RvsqHttpPoller:
+    """
+    Replays a captured search postback through the context's HTTP client,
+    which shares the browser cookies and keeps connections alive.
+    """
+    def __init__(self, request_context, captured):
+        self.request_context = request_context
+        self.captured = captured
+
+    async def poll(self):
+        """
+        Returns (status, clinic_count). Status 'expired' means the session
+        or form state is no longer valid and the browser has to take over;
+        'throttle' and 'challenge' mean the site is pushing back.
+        """
+        response = await self.request_context.fetch(
+            self.captured.url,
+            method=self.captured.method,
+            headers=self.captured.headers,
+            data=self.captured.post_data,
+            max_redirects=0,
+            timeout=15000
+        )
+        if response.status != 200:
+            log_message(f"[RVSQ] HTTP poll returned {response.status}")
+            await response.dispose()
+            return circuit.kind_from_status(response.status) or 'expired', 0
+        result, state_fields = classify_response(await response.text())
+        await response.dispose()
+        if result.status not in (classifier.NO_SLOTS, classifier.SLOTS):
+            return 'expired', 0
+        self.captured.update_state(state_fields)
+        return result.status, result.clinic_count
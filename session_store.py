@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import threading
+import time
+from logger import log_message
+import security
+
+SESSIONS_DIR = 'sessions'
+
+# Snapshots older than this are dropped even if their cookies are still valid
+DEFAULT_MAX_AGE_HOURS = 24
+
+# Cookies this close to expiring are not worth restoring
+EXPIRY_MARGIN = 60
+
+# The one snapshot per site is restored into every profile's context, so
+# only local storage entries about consent and bot clearance are kept;
+# anything else may belong to the person who searched
+STORAGE_KEY_PATTERN = re.compile(r'consent|cookie|didomi|axeptio|tarteaucitron|^_?_?cf|turnstile|clearance', re.IGNORECASE)
+
+_lock = threading.Lock()
+
+def snapshot_path(site):
+    return os.path.join(SESSIONS_DIR, re.sub(r'[^\w.-]', '_', site) + '.session')
+
+def persistent_state(state, now=None):
+    """
+    Keep what survives a browser restart: cookies with an expiry date still
+    in the future (Cloudflare clearance, consent) and the consent/clearance
+    entries of local storage (STORAGE_KEY_PATTERN). Session cookies carry
+    the form state of one person and are dropped.
+    """
+    now = now or time.time()
+    cookies = [cookie for cookie in state.get('cookies', [])
+               if cookie.get('expires', -1) > now + EXPIRY_MARGIN]
+    origins = []
+    for origin in state.get('origins', []):
+        entries = [entry for entry in origin.get('localStorage', []) if STORAGE_KEY_PATTERN.search(entry['name'])]
+        if entries:
+            origins.append({'origin': origin['origin'], 'localStorage': entries})
+    return {'cookies': cookies, 'origins': origins}
+
+def expires_at(saved_at, max_age_hours):
+    """
+    The snapshot is usable until its max age. Short-lived cookies (__cf_bm
+    lasts 30 minutes) do not end it: load() drops expired cookies one by one.
+    """
+    return saved_at + max_age_hours * 3600
+
+def save(site, state, max_age_hours=DEFAULT_MAX_AGE_HOURS):
+    """Encrypt and store the persistent part of a Playwright storage state."""
+    state = persistent_state(state)
+    if not state['cookies'] and not state['origins']:
+        return False
+    saved_at = time.time()
+    record = {
+        'site': site,
+        'saved_at': saved_at,
+        'expires_at': expires_at(saved_at, max_age_hours),
+        'state': state,
+    }
+    with _lock:
+        os.makedirs(SESSIONS_DIR, exist_ok=True)
+        with open(snapshot_path(site), 'w') as f:
+            f.write(security.encrypt_data(json.dumps(record), security.load_key()))
+    return True
+
+def load(site, max_age_hours=DEFAULT_MAX_AGE_HOURS):
+    """
+    Storage state saved for `site`, ready for new_context(storage_state=...),
+    or None. Expired or unreadable snapshots are removed.
+    """
+    path = snapshot_path(site)
+    with _lock:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                record = json.loads(security.decrypt_data(f.read(), security.load_key()))
+        except Exception as e:
+            log_message(f"[Session] Discarding unreadable snapshot for {site}: {e}")
+            _remove(path)
+            return None
+    now = time.time()
+    if now >= record['expires_at'] or now - record['saved_at'] > max_age_hours * 3600:
+        log_message(f"[Session] Snapshot for {site} has expired")
+        invalidate(site)
+        return None
+    state = persistent_state(record['state'], now)
+    if not state['cookies'] and not state['origins']:
+        invalidate(site)
+        return None
+    return state
+
+def invalidate(site, reason=None):
+    with _lock:
+        if _remove(snapshot_path(site)) and reason:
+            log_message(f"[Session] Dropped saved session for {site}: {reason}")
+
+def clear():
+    """Remove every saved session."""
+    with _lock:
+        if os.path.isdir(SESSIONS_DIR):
+            for name in os.listdir(SESSIONS_DIR):
+                _remove(os.path.join(SESSIONS_DIR, name))
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
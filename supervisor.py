@@ -0,0 +1,322 @@
+"""
+Runs every search job in its own worker process.
+
+A hung Playwright call, a leaking Chromium or a crash in one search then
+only takes down that worker: the GUI and the other searches keep going,
+and the supervisor restarts it with exponential backoff. Workers send
+their log records, status changes, slot events, result changes, metric
+updates, circuit breaker changes and pacing polls back over a
+multiprocessing queue; the supervisor replays them locally. Breaker
+changes are also passed on to the other workers, so a site throttling one
+search pauses them all, and only the supervisor writes the pacing history.
+"""
+import concurrent.futures
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from datetime import datetime
+import logger
+from logger import log_message
+import circuit
+import jobs
+import metrics
+import pacing
+
+# Restart backoff: base * 2^(crashes - 1), capped; reset after a long healthy run
+RESTART_BASE_DELAY = 5
+RESTART_MAX_DELAY = 300
+HEALTHY_RUN_SECONDS = 600
+
+# Graceful stop: time given to workers to close their browser before terminate()
+STOP_TIMEOUT = 30
+
+class StopEventFlag:
+    """search_running for a worker: false once the supervisor asks it to stop."""
+    def __init__(self, stop_event):
+        self.stop_event = stop_event
+
+    def set(self, value):
+        if not value:
+            self.stop_event.set()
+
+    def get(self):
+        return not self.stop_event.is_set()
+
+
+class QueueSink:
+    """Logger sink forwarding records to the supervisor."""
+    def __init__(self, events, job_name):
+        self.events = events
+        self.job_name = job_name
+
+    def put(self, record):
+        try:
+            self.events.put(('log', self.job_name, record.timestamp, record.level, record.site, record.text))
+        except Exception:
+            pass
+
+
+def job_spec(job):
+    return {
+        'site': job.site,
+        'profile_name': job.profile_name,
+        'personal_info': job.personal_info,
+        'postal_code': job.postal_code,
+        'autobook': job.autobook,
+    }
+
+def follow_supervisor(inbox):
+    """Worker thread applying the breaker changes of the other workers."""
+    while True:
+        message = inbox.get()
+        if message is None:
+            return
+        kind, site, state = message
+        if kind == 'circuit':
+            circuit.get_breaker(site).apply(state)
+
+def worker_main(spec, config, events, stop_event, inbox, slice_seconds=None, circuit_states=None, profile_event=None):
+    """Entry point of a worker process: one job on its own engine and browser."""
+    job = jobs.SearchJob(**spec)
+    # Ctrl+C reaches the whole process group; stopping is the supervisor's call
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.default_log.add_sink(QueueSink(events, job.name))
+    for site, state in (circuit_states or {}).items():
+        circuit.get_breaker(site).apply(state)
+    threading.Thread(target=follow_supervisor, args=(inbox,), name="supervisor-inbox", daemon=True).start()
+    circuit.breaker_listeners.append(lambda site, state: events.put(('circuit', job.name, site, state)))
+    metrics.default_registry.add_listener(
+        lambda kind, name, value, labels: events.put(('metric', job.name, kind, name, value, labels)))
+    pacing.persist_history = False
+    pacing.history_listeners.append(lambda site, found, timestamp: events.put(('pacing', job.name, site, found, timestamp)))
+    # Playwright is only imported in the worker
+    import browser
+    import artifacts
+    from engine import get_engine
+    import result_changes
+    browser.slot_listeners.append(lambda url: events.put(('slot', job.name, time.time(), url)))
+    result_changes.default_stream.add_listener(lambda event: events.put(('change', job.name, event.to_dict())))
+    events.put(('status', job.name, jobs.RUNNING, None))
+    status, error = jobs.DONE, None
+    profile_running = StopEventFlag(profile_event) if profile_event else None
+    job_running = jobs.JobRunning(StopEventFlag(stop_event), slice_seconds, profile_running)
+    try:
+        get_engine().run(browser.run_job(job, job_running, config))
+        if stop_event.is_set():
+            status = jobs.STOPPED
+        elif job_running.rotated:
+            status = jobs.PENDING
+    except Exception as e:
+        status, error = jobs.FAILED, str(e)
+    finally:
+        get_engine().shutdown()
+        artifacts.flush_all()
+        events.put(('status', job.name, status, error))
+
+
+class Worker:
+    def __init__(self, job):
+        self.job = job
+        self.process = None
+        self.stop_event = None
+        self.inbox = None
+        self.crashes = 0
+        self.queued_at = 0  # waiting workers start in this order
+        self.started_at = None
+        self.restart_at = None
+        self.reported = None  # last status sent by the worker itself
+
+    @property
+    def name(self):
+        return self.job.name
+
+
+class Supervisor:
+    """
+    Starts one worker process per job (at most `max_concurrency` at a
+    time), restarts the ones that crash or fail, and stops them all when
+    `search_running` goes false. start() returns a Future resolving to
+    the job statuses, like browser.submit_jobs.
+    """
+    def __init__(self, config, sites, search_running, autobook=None, max_concurrency=None):
+        self.config = config
+        self.search_running = search_running
+        self.max_concurrency = max(1, max_concurrency or config['personal_info'].get('max_concurrency', jobs.DEFAULT_MAX_CONCURRENCY))
+        self.workers = [Worker(job) for job in jobs.build_jobs(config, sites, autobook)]
+        self.slice_seconds = jobs.slice_seconds(len(self.workers), self.max_concurrency, config['personal_info'])
+        # spawn: no forked copy of the Tk process or of the engine thread
+        self.mp = multiprocessing.get_context('spawn')
+        # Set when a job books for that profile: its other workers stop
+        self.profile_events = {worker.job.profile_name: self.mp.Event() for worker in self.workers}
+        self.events = self.mp.Queue()
+        self.slot_events = []
+        self.history = None
+        self.future = concurrent.futures.Future()
+        self.thread = None
+
+    def start(self):
+        message = f"[Supervisor] {len(self.workers)} job(s) in worker processes, up to {self.max_concurrency} at a time"
+        if self.slice_seconds:
+            message += f", taking turns every {int(self.slice_seconds)}s"
+        log_message(message)
+        self.thread = threading.Thread(target=self._run, name="supervisor", daemon=True)
+        self.thread.start()
+        return self.future
+
+    def _spawn(self, worker):
+        worker.stop_event = self.mp.Event()
+        worker.inbox = self.mp.Queue()
+        worker.reported = None
+        circuit_states = {site: circuit.get_breaker(site).state_dict() for site in circuit.states()}
+        worker.process = self.mp.Process(
+            target=worker_main,
+            args=(job_spec(worker.job), self.config, self.events, worker.stop_event,
+                  worker.inbox, self.slice_seconds, circuit_states, self.profile_events[worker.job.profile_name]),
+            name=f"meulade-{worker.name}",
+            daemon=True
+        )
+        worker.process.start()
+        worker.started_at = time.time()
+        worker.restart_at = None
+        worker.job.status = jobs.RUNNING
+        log_message(f"[Supervisor] {worker.name}: started (pid {worker.process.pid})")
+
+    def _run(self):
+        try:
+            while self.search_running.get():
+                self._drain(0.25)
+                self._check_workers()
+                if all(worker.job.status in (jobs.DONE, jobs.STOPPED) for worker in self.workers):
+                    break
+            self.stop()
+        except Exception as e:
+            log_message(f"[Supervisor] Error: {e}")
+            self.stop()
+        finally:
+            self.future.set_result(self.statuses())
+
+    def _drain(self, timeout):
+        """Replay everything the workers sent, waiting up to `timeout` for the first event."""
+        try:
+            event = self.events.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            self._handle(event)
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return
+
+    def _handle(self, event):
+        kind, job_name = event[0], event[1]
+        if kind == 'log':
+            _, _, timestamp, level, site, text = event
+            logger.default_log.append(text, level, site)
+        elif kind == 'slot':
+            self.slot_events.append({'job': job_name, 'time': event[2], 'url': event[3]})
+            log_message(f"[Supervisor] {job_name}: slot found")
+        elif kind == 'change':
+            import result_changes
+            change = event[2]
+            result_changes.default_stream.append(change['site'], change['key'], change['fingerprint'],
+                                                 change['status'], change['previous_status'], change['detail'])
+        elif kind == 'metric':
+            _, _, method, name, value, labels = event
+            getattr(metrics.default_registry, method)(name, value, **labels)
+        elif kind == 'circuit':
+            _, _, site, state = event
+            circuit.get_breaker(site).apply(state)
+            for worker in self.workers:
+                if worker.name != job_name and worker.process and worker.process.is_alive():
+                    worker.inbox.put(('circuit', site, state))
+        elif kind == 'pacing':
+            _, _, site, found, timestamp = event
+            if self.history is None:
+                self.history = pacing.SlotHistory()
+            self.history.record(site, found, datetime.fromtimestamp(timestamp))
+        elif kind == 'status':
+            worker = next((worker for worker in self.workers if worker.name == job_name), None)
+            if worker:
+                worker.reported = event[2]
+                if event[3]:
+                    worker.job.error = event[3]
+
+    def _check_workers(self):
+        now = time.time()
+        for worker in self.workers:
+            if worker.process is None or worker.process.is_alive():
+                continue
+            worker.process.join()
+            # Its last status event is in the pipe by the time the process is gone
+            self._drain(0)
+            job = worker.job
+            if worker.reported in (jobs.DONE, jobs.STOPPED):
+                job.status = worker.reported
+                worker.process = None
+                log_message(f"[Supervisor] {worker.name}: {job.status}")
+                continue
+            worker.queued_at = now
+            if worker.reported == jobs.PENDING:
+                # End of its turn: queue up again behind the waiting jobs
+                job.status = jobs.PENDING
+                worker.process = None
+                log_message(f"[Supervisor] {worker.name}: turn over, waiting for a slot")
+                continue
+            # Crashed, killed or failed: try again later
+            if now - worker.started_at > HEALTHY_RUN_SECONDS:
+                worker.crashes = 0
+            worker.crashes += 1
+            delay = min(RESTART_MAX_DELAY, RESTART_BASE_DELAY * 2 ** (worker.crashes - 1))
+            job.status = jobs.FAILED
+            reason = job.error if worker.reported == jobs.FAILED else f"exit code {worker.process.exitcode}"
+            log_message(f"[Supervisor] {worker.name}: worker stopped ({reason}), restarting in {delay}s")
+            worker.process = None
+            worker.restart_at = now + delay
+
+        running = sum(1 for worker in self.workers if worker.process)
+        for worker in sorted(self.workers, key=lambda worker: worker.queued_at):
+            if running >= self.max_concurrency:
+                break
+            if worker.process is None and self.profile_events[worker.job.profile_name].is_set():
+                if worker.job.status not in (jobs.DONE, jobs.STOPPED):
+                    # Another job of this person booked an appointment
+                    worker.job.status = jobs.DONE
+                    log_message(f"[Supervisor] {worker.name}: {worker.job.status}")
+                continue
+            if (worker.process is None and worker.job.status not in (jobs.DONE, jobs.STOPPED)
+                    and (worker.restart_at is None or now >= worker.restart_at)):
+                self._spawn(worker)
+                running += 1
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Ask every worker to stop, then terminate the ones still running after `timeout`."""
+        alive = [worker for worker in self.workers if worker.process and worker.process.is_alive()]
+        for worker in alive:
+            worker.stop_event.set()
+        deadline = time.time() + timeout
+        while alive and time.time() < deadline:
+            self._drain(0.25)
+            alive = [worker for worker in alive if worker.process.is_alive()]
+        for worker in alive:
+            log_message(f"[Supervisor] {worker.name}: not stopping, terminating")
+            worker.process.terminate()
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.process.kill()
+        self._drain(0)
+        if self.history:
+            self.history.flush()
+        for worker in self.workers:
+            if worker.job.status != jobs.DONE:
+                worker.job.status = jobs.STOPPED
+
+    def statuses(self):
+        return {worker.name: worker.job.status for worker in self.workers}
+
+
+def submit_jobs(config, sites, search_running, autobook=None, max_concurrency=None):
+    """Process-based counterpart of browser.submit_jobs."""
+    return Supervisor(config, sites, search_running, autobook, max_concurrency).start()